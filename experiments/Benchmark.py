@@ -0,0 +1,17 @@
+# Description: Helpers shared by the benchmark scripts (EfficiencyScores/BenchmarkEfficiency.py,
+# Wind/BenchmarkWindEnergy.py, BenchmarkLandCoverImport.py): best-of-n timing and seeded random inputs.
+
+import time
+
+# Function to time a callable, keeping the best of a few runs
+def best_time(func, repeats=3):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+# Function to draw n uniform values for each (low, high) range from a NumPy generator, one array per range
+def uniform_columns(rng, n, ranges):
+    return [rng.uniform(low, high, n) for low, high in ranges]
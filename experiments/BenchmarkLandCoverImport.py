@@ -0,0 +1,42 @@
+# Description: Benchmark of the start-up cost of the land-cover modules. Times importing LandTypePoint,
+# LandTypePercentages and LandCover in fresh interpreters, against the heavy packages those modules used to import
+# and initialize eagerly (ee, geemap, matplotlib, IPython), to check a batch worker starts in milliseconds.
+
+import importlib.util
+import os
+import subprocess
+import sys
+
+from Benchmark import best_time
+
+EXPERIMENTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# What the land-cover scripts imported at module level before the lazy imports
+EAGER_IMPORTS = ["ee", "geemap", "numpy", "matplotlib.pyplot", "IPython.display"]
+
+# Function to time importing some modules in a fresh interpreter, keeping the best of a few runs
+def import_time(modules, repeats=5):
+    code = "; ".join(f"import {module}" for module in modules)
+    return best_time(lambda: subprocess.run([sys.executable, "-c", code], cwd=EXPERIMENTS_DIR, check=True), repeats)
+
+# Function to check whether a module can be imported here, without importing it
+def is_installed(module):
+    try:
+        return importlib.util.find_spec(module) is not None
+    except ModuleNotFoundError:
+        return False
+
+if __name__ == "__main__":
+    baseline = import_time([])
+    print(f"Bare interpreter start-up: {baseline * 1000:.0f} ms\n")
+
+    for modules in (["LandCover"], ["LandTypePoint"], ["LandTypePercentages"]):
+        print(f"import {', '.join(modules)}: {(import_time(modules) - baseline) * 1000:.0f} ms")
+
+    installed = [module for module in EAGER_IMPORTS if is_installed(module)]
+    missing = [module for module in EAGER_IMPORTS if module not in installed]
+    if installed:
+        print(f"\nPreviously imported eagerly ({', '.join(installed)}): {(import_time(installed) - baseline) * 1000:.0f} ms")
+    if missing:
+        print(f"Not installed, left out of the comparison: {', '.join(missing)}")
+    print("(ee.Initialize also ran at import before, adding a network round trip on top)")
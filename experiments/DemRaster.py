@@ -0,0 +1,180 @@
+# Description: Local DEM backend for elevation, slope and aspect. Reads a GeoTIFF DEM in geographic
+# coordinates (SRTM / Copernicus GLO-30 tiles, or a VRT mosaic of them) through memory-mapped or
+# windowed reads and computes terrain for whole batches of points with vectorized finite differences.
+# Offers the same get_elevation / get_slope / get_terrain functions as Elevation.py, without any API calls.
+
+import math
+import os
+
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+
+DEM_PATH = os.environ.get("DEM_PATH", "dem.tif")
+
+METERS_PER_DEGREE_LAT = 111320  # 1 degree latitude ≈ 111.32 km
+
+# Sites are processed in blocks of this many pixels, so a batch spread over a large DEM
+# never reads more than one block-sized window at a time
+BLOCK_SIZE = 2048
+
+_default_dem = None
+
+class RasterioBand:
+    """
+    Array-like view of the first band of a rasterio dataset; slicing reads only that window.
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.shape = (dataset.height, dataset.width)
+
+    def __getitem__(self, index):
+        rows, cols = index
+        return self.dataset.read(1, window=Window.from_slices(rows, cols))
+
+class DemRaster:
+    """
+    North-up elevation raster. data is a 2D array-like (NumPy array, np.memmap or RasterioBand)
+    whose pixel (0, 0) has its top-left corner at (west, north); res_lon and res_lat are the
+    pixel sizes in degrees. nodata pixels are treated as missing (NaN).
+    """
+
+    def __init__(self, data, west, north, res_lon, res_lat, nodata=None):
+        self.data = data
+        self.west = west
+        self.north = north
+        self.res_lon = res_lon
+        self.res_lat = res_lat
+        self.nodata = nodata
+        self.height, self.width = data.shape
+
+    @classmethod
+    def open(cls, path):
+        # Memory-map uncompressed rasters directly; compressed or tiled ones fall back to windowed reads
+        dataset = rasterio.open(path)
+        transform = dataset.transform
+        try:
+            import tifffile
+            data = tifffile.memmap(path)
+        except (ImportError, ValueError):
+            data = RasterioBand(dataset)
+        return cls(data, transform.c, transform.f, transform.a, -transform.e, dataset.nodata)
+
+    @classmethod
+    def from_array(cls, array, west, north, res_lon, res_lat, nodata=None):
+        return cls(np.asarray(array), west, north, res_lon, res_lat, nodata)
+
+    def to_pixel(self, lats, lons):
+        # Row/column of the pixel containing each point
+        rows = np.floor((self.north - np.asarray(lats, dtype=float)) / self.res_lat).astype(int)
+        cols = np.floor((np.asarray(lons, dtype=float) - self.west) / self.res_lon).astype(int)
+        return rows, cols
+
+    def read_window(self, row_start, row_end, col_start, col_end):
+        """
+        Reads rows [row_start, row_end) and columns [col_start, col_end) as float with NaN for nodata.
+        Parts of the window outside the raster repeat the nearest edge pixel.
+        """
+        r0, r1 = max(row_start, 0), min(row_end, self.height)
+        c0, c1 = max(col_start, 0), min(col_end, self.width)
+        window = np.asarray(self.data[r0:r1, c0:c1], dtype=float)
+        if self.nodata is not None:
+            window[window == self.nodata] = np.nan
+        padding = ((r0 - row_start, row_end - r1), (c0 - col_start, col_end - c1))
+        if any(p for pair in padding for p in pair):
+            window = np.pad(window, padding, mode="edge")
+        return window
+
+    def terrain(self, lats, lons, distance_m=None):
+        """
+        Elevation (m), slope (%) and aspect (degrees clockwise from north, direction the slope faces)
+        for arrays of points. Slope and aspect use Horn's 3x3 finite differences with neighbours
+        distance_m apart (one pixel by default). Points outside the raster get NaN.
+        """
+        lats = np.asarray(lats, dtype=float).ravel()
+        lons = np.asarray(lons, dtype=float).ravel()
+        rows, cols = self.to_pixel(lats, lons)
+        pixel_m = self.res_lat * METERS_PER_DEGREE_LAT
+        step = 1 if distance_m is None else max(1, int(round(distance_m / pixel_m)))
+
+        elevation = np.full(len(lats), np.nan)
+        slope = np.full(len(lats), np.nan)
+        aspect = np.full(len(lats), np.nan)
+        inside = (rows >= 0) & (rows < self.height) & (cols >= 0) & (cols < self.width)
+
+        # One padded window per block of sites
+        blocks = (rows // BLOCK_SIZE) * (self.width // BLOCK_SIZE + 1) + cols // BLOCK_SIZE
+        for block in np.unique(blocks[inside]):
+            index = np.nonzero(inside & (blocks == block))[0]
+            r, c = rows[index], cols[index]
+            row_start, col_start = r.min() - step, c.min() - step
+            window = self.read_window(row_start, r.max() + step + 1, col_start, c.max() + step + 1)
+            r, c = r - row_start, c - col_start
+
+            # 3x3 neighbourhoods (a b c / d e f / g h i, north at the top) for every site at once
+            offsets = np.array([-step, 0, step])
+            z = window[r[:, None, None] + offsets[None, :, None], c[:, None, None] + offsets[None, None, :]]
+            dx = step * self.res_lon * METERS_PER_DEGREE_LAT * np.cos(np.radians(lats[index]))
+            dy = step * pixel_m
+            dz_dx = ((z[:, 0, 2] + 2 * z[:, 1, 2] + z[:, 2, 2]) - (z[:, 0, 0] + 2 * z[:, 1, 0] + z[:, 2, 0])) / (8 * dx)
+            dz_dy = ((z[:, 0, 0] + 2 * z[:, 0, 1] + z[:, 0, 2]) - (z[:, 2, 0] + 2 * z[:, 2, 1] + z[:, 2, 2])) / (8 * dy)
+
+            elevation[index] = z[:, 1, 1]
+            slope[index] = np.hypot(dz_dx, dz_dy) * 100
+            aspect[index] = np.where(slope[index] == 0, np.nan, np.degrees(np.arctan2(-dz_dx, -dz_dy)) % 360)
+
+        return {"elevation": elevation, "slope": slope, "aspect": aspect}
+
+    def get_terrain(self, sites, distance_m=None):
+        # Same output as Elevation.get_terrain: one dict per site, None for missing values
+        sites = np.asarray(sites, dtype=float).reshape(-1, 2)
+        terrain = self.terrain(sites[:, 0], sites[:, 1], distance_m)
+        return [
+            {key: None if math.isnan(value) else float(value) for key, value in zip(terrain, values)}
+            for values in zip(*terrain.values())
+        ]
+
+# Function to get the DEM configured by DEM_PATH, opened once per process
+def get_default_dem():
+    global _default_dem
+    if _default_dem is None:
+        _default_dem = DemRaster.open(DEM_PATH)
+    return _default_dem
+
+# Function to get elevation, slope and aspect for many sites from the local DEM
+def get_terrain(sites, distance_m=100, dem=None):
+    return (dem or get_default_dem()).get_terrain(sites, distance_m)
+
+# Function to get the elevation of a single point from the local DEM
+def get_elevation(lat, lon, dem=None):
+    return get_terrain([(lat, lon)], None, dem)[0]["elevation"]
+
+# Function to get the slope (%) at a site from the local DEM
+def get_slope(lat, lon, move_distance=100, dem=None):
+    return get_terrain([(lat, lon)], move_distance, dem)[0]["slope"]
+
+# Function to build a synthetic DEM (a tilted plane plus a Gaussian hill) for trying the backend offline
+def synthetic_dem(west=21.0, north=39.5, size=1200, res=1 / 3600):
+    rows, cols = np.mgrid[0:size, 0:size]
+    y = -rows * res * METERS_PER_DEGREE_LAT
+    x = cols * res * METERS_PER_DEGREE_LAT * math.cos(math.radians(north))
+    hill = 300 * np.exp(-((x - x.mean()) ** 2 + (y - y.mean()) ** 2) / (2 * 2000 ** 2))
+    plane = 0.05 * x + 0.02 * y
+    return DemRaster.from_array((500 + plane + hill).astype(np.float32), west, north, res, res)
+
+
+if __name__ == "__main__":
+    import time
+
+    # Example usage: terrain for many sites on a synthetic 1 arc-second DEM
+    dem = synthetic_dem()
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(39.5 - 1200 / 3600, 39.5, 100000)
+    lons = rng.uniform(21.0, 21.0 + 1200 / 3600, 100000)
+
+    start = time.perf_counter()
+    terrain = dem.terrain(lats, lons, distance_m=100)
+    elapsed = time.perf_counter() - start
+    print(f"{len(lats)} sites in {elapsed:.3f} s ({elapsed / len(lats) * 1e6:.2f} µs per site)")
+    print("First site:", dem.get_terrain([(lats[0], lons[0])], distance_m=100)[0])
@@ -0,0 +1,198 @@
+# Description: Precomputed distance-to-grid and distance-to-road rasters. Rasterizes the power and road
+# geometries of the OSM indexes (the features GridAvailability and RoadsNearby look for) into Web Mercator
+# z/x/y tiles, computes Euclidean distance transforms with scipy.ndimage and stores each tile as a raw
+# uint16 file of metres. Point lookups memory-map the tiles, so a map click is one array index.
+
+import json
+import math
+import os
+
+import numpy as np
+from scipy import ndimage
+from scipy.spatial import cKDTree
+
+from GridAvailability import POWER_FILTER
+from OsmIndex import EARTH_RADIUS, get_power_index
+from RoadsNearby import get_road_index
+
+TILE_ROOT = os.environ.get("TILE_ROOT", "distance_tiles")
+
+TILE_SIZE = 256
+DEFAULT_ZOOM = 12  # About 38 m pixels at the equator, 30 m in Greece
+
+# Distances are stored in whole metres; NO_FEATURE marks pixels with nothing within max_distance
+NO_FEATURE = np.iinfo(np.uint16).max
+MAX_DISTANCE = NO_FEATURE - 1
+
+# Power types that count as grid (the same set GridAvailability asks Overpass for)
+GRID_TYPES = POWER_FILTER.split("|")
+
+# Function to convert latitude/longitude (degrees) into global Web Mercator pixel coordinates at a zoom level
+def to_global_pixel(lats, lons, zoom):
+    size = TILE_SIZE * 2 ** zoom
+    lat = np.radians(np.clip(np.asarray(lats, dtype=float), -85.0511, 85.0511))
+    x = (np.asarray(lons, dtype=float) + 180) / 360 * size
+    y = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / math.pi) / 2 * size
+    return x, y
+
+# Function to get the latitude (degrees) of a global Web Mercator pixel row
+def pixel_to_lat(y, zoom):
+    size = TILE_SIZE * 2 ** zoom
+    return np.degrees(np.arctan(np.sinh(math.pi * (1 - 2 * np.asarray(y, dtype=float) / size))))
+
+# Function to get the ground size (m) of a Web Mercator pixel at a latitude
+def pixel_size_m(lat, zoom):
+    return 2 * math.pi * EARTH_RADIUS * math.cos(math.radians(lat)) / (TILE_SIZE * 2 ** zoom)
+
+# Function to list the (x, y) tiles covering a bbox (lat_min, lon_min, lat_max, lon_max)
+def tiles_for_bbox(bbox, zoom):
+    lat_min, lon_min, lat_max, lon_max = bbox
+    x0, y0 = to_global_pixel(lat_max, lon_min, zoom)
+    x1, y1 = to_global_pixel(lat_min, lon_max, zoom)
+    xs = range(int(x0 // TILE_SIZE), int(x1 // TILE_SIZE) + 1)
+    ys = range(int(y0 // TILE_SIZE), int(y1 // TILE_SIZE) + 1)
+    return [(x, y) for x in xs for y in ys]
+
+# Function to compute the distance tile (metres, uint16) for one tile from feature points in global pixel coordinates
+def distance_tile(tree, tile_x, tile_y, zoom, max_distance=MAX_DISTANCE):
+    """
+    The tile is padded by max_distance worth of pixels so features in neighbouring tiles count,
+    feature points are burnt into the padded window and the Euclidean distance transform gives the
+    distance from every pixel centre to the nearest feature pixel. Returns None when no feature is
+    within max_distance of the tile.
+    """
+    center_lat = pixel_to_lat((tile_y + 0.5) * TILE_SIZE, zoom)
+    pixel_m = pixel_size_m(center_lat, zoom)
+    margin = int(math.ceil(max_distance / pixel_m))
+    left, top = tile_x * TILE_SIZE - margin, tile_y * TILE_SIZE - margin
+    size = TILE_SIZE + 2 * margin
+
+    # Points in the padded window (Chebyshev ball around the window centre)
+    center = (left + size / 2, top + size / 2)
+    points = tree.data[tree.query_ball_point(center, size / 2, p=np.inf)]
+    if not len(points):
+        return None
+    cols = np.clip(np.floor(points[:, 0] - left).astype(int), 0, size - 1)
+    rows = np.clip(np.floor(points[:, 1] - top).astype(int), 0, size - 1)
+    empty = np.ones((size, size), dtype=bool)
+    empty[rows, cols] = False
+
+    distance = ndimage.distance_transform_edt(empty, sampling=pixel_m)[margin:margin + TILE_SIZE, margin:margin + TILE_SIZE]
+    if distance.min() > max_distance:
+        return None
+    return np.where(distance > max_distance, NO_FEATURE, np.round(distance)).astype(np.uint16)
+
+# Function to build the distance tiles of one layer for a bbox from an OsmIndex
+def build_distance_tiles(index, bbox, layer, types=None, zoom=DEFAULT_ZOOM, max_distance=5000, root=TILE_ROOT):
+    """
+    Writes {root}/{layer}/{zoom}/{x}/{y}.u16 (TILE_SIZE x TILE_SIZE little-endian uint16 metres) for every
+    tile covering bbox (lat_min, lon_min, lat_max, lon_max) and {root}/{layer}/meta.json. Tiles without any
+    feature within max_distance (m) are not written. Returns the number of tiles written.
+    """
+    if max_distance > MAX_DISTANCE:
+        print(f"max_distance is limited to {MAX_DISTANCE} m by the uint16 tiles")
+        max_distance = MAX_DISTANCE
+    points = np.ones(len(index.lats), dtype=bool) if types is None else np.isin(index.feature_types[index.features], types)
+    x, y = to_global_pixel(index.lats[points], index.lons[points], zoom)
+    tree = cKDTree(np.column_stack([x, y]))
+
+    written = 0
+    for tile_x, tile_y in tiles_for_bbox(bbox, zoom):
+        tile = distance_tile(tree, tile_x, tile_y, zoom, max_distance) if len(x) else None
+        if tile is None:
+            continue
+        path = os.path.join(root, layer, str(zoom), str(tile_x), f"{tile_y}.u16")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tile.astype("<u2").tofile(path)
+        written += 1
+
+    os.makedirs(os.path.join(root, layer), exist_ok=True)
+    with open(os.path.join(root, layer, "meta.json"), "w") as file:
+        json.dump({"zoom": zoom, "bbox": list(bbox), "max_distance": max_distance, "types": types}, file)
+    return written
+
+# Function to build the grid, substation and road layers for a bbox from the local OSM indexes
+def build_proximity_tiles(bbox, zoom=DEFAULT_ZOOM, max_distance=5000, root=TILE_ROOT, power_index=None, road_index=None):
+    power_index = power_index or get_power_index()
+    road_index = road_index or get_road_index()
+    return {
+        "grid": build_distance_tiles(power_index, bbox, "grid", GRID_TYPES, zoom, max_distance, root),
+        "substation": build_distance_tiles(power_index, bbox, "substation", ["substation"], zoom, max_distance, root),
+        "road": build_distance_tiles(road_index, bbox, "road", None, zoom, max_distance, root),
+    }
+
+class DistanceTiles:
+    """
+    Reads one layer written by build_distance_tiles. Tiles are memory-mapped on first use and kept open,
+    so a lookup is a tile path per site and one array index.
+    """
+
+    def __init__(self, layer, root=TILE_ROOT):
+        self.directory = os.path.join(root, layer)
+        with open(os.path.join(self.directory, "meta.json")) as file:
+            meta = json.load(file)
+        self.zoom = meta["zoom"]
+        self.bbox = meta["bbox"]
+        self.max_distance = meta["max_distance"]
+        self._tiles = {}
+
+    def _tile(self, tile_x, tile_y):
+        # None for tiles that were not written (nothing within max_distance)
+        key = (tile_x, tile_y)
+        if key not in self._tiles:
+            path = os.path.join(self.directory, str(self.zoom), str(tile_x), f"{tile_y}.u16")
+            self._tiles[key] = np.memmap(path, dtype="<u2", mode="r", shape=(TILE_SIZE, TILE_SIZE)) if os.path.exists(path) else None
+        return self._tiles[key]
+
+    def lookup(self, lats, lons):
+        """
+        Distance (m) to the nearest feature for every site: inf when nothing is within max_distance and
+        NaN outside the bbox the layer was built for.
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=float))
+        lons = np.atleast_1d(np.asarray(lons, dtype=float))
+        lat_min, lon_min, lat_max, lon_max = self.bbox
+        inside = (lats >= lat_min) & (lats <= lat_max) & (lons >= lon_min) & (lons <= lon_max)
+        x, y = to_global_pixel(lats, lons, self.zoom)
+        px, py = np.floor(x).astype(np.int64), np.floor(y).astype(np.int64)
+
+        distance = np.full(len(lats), np.nan)
+        distance[inside] = np.inf
+        tile_ids = (px // TILE_SIZE) * (2 ** self.zoom) + py // TILE_SIZE
+        for tile_id in np.unique(tile_ids[inside]):
+            tile = self._tile(int(tile_id // 2 ** self.zoom), int(tile_id % 2 ** self.zoom))
+            if tile is None:
+                continue
+            sites = np.flatnonzero(inside & (tile_ids == tile_id))
+            values = tile[py[sites] % TILE_SIZE, px[sites] % TILE_SIZE].astype(float)
+            distance[sites] = np.where(values == NO_FEATURE, np.inf, values)
+        return distance
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    from OsmIndex import OsmIndex, write_sample_extract
+    from RoadsNearby import ROAD_TYPES
+
+    # Example usage: tile the sample extract around Athens, then look up proximity for many clicks
+    bbox = (37.8, 23.5, 38.2, 24.0)
+    with tempfile.TemporaryDirectory() as directory:
+        extract = os.path.join(directory, "sample.osm")
+        write_sample_extract(extract)
+        power_index = OsmIndex.from_osm(extract)
+        road_index = OsmIndex.from_osm(extract, types=ROAD_TYPES, key="highway")
+
+        start = time.perf_counter()
+        written = build_proximity_tiles(bbox, root=directory, power_index=power_index, road_index=road_index)
+        print(f"Tiles written {written} in {time.perf_counter() - start:.2f} s")
+
+        rng = np.random.default_rng(0)
+        lats = rng.uniform(37.8, 38.2, 100000)
+        lons = rng.uniform(23.5, 24.0, 100000)
+        for layer in written:
+            tiles = DistanceTiles(layer, root=directory)
+            start = time.perf_counter()
+            distance = tiles.lookup(lats, lons)
+            print(f"{layer}: {len(lats):,} lookups in {time.perf_counter() - start:.3f} s, first sites (m):", distance[:3].tolist())
@@ -0,0 +1,44 @@
+# Description: Benchmark of the scalar calculate_efficiency against calculate_efficiency_batch.
+# Checks that both give bit-identical scores and reports how throughput scales with batch size.
+
+import os
+import sys
+
+import numpy as np
+
+# Make the shared modules in experiments/ importable when running this script directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Benchmark import best_time, uniform_columns
+from SolarScore import calculate_efficiency, calculate_efficiency_batch
+
+SEEDS = [0, 1, 2, 3, 4]
+
+# Ranges of temp (°C), cloud (%), solar (W/m², the range solar_norm is scaled for), elevation (m) and slope (%),
+# covering every slope penalty
+SITE_RANGES = [(-20, 45), (0, 100), (0, 1000), (0, 3000), (0, 40)]
+
+# Function to generate random site features (temp, cloud, solar, elevation, slope)
+def random_sites(n, seed=0):
+    return tuple(uniform_columns(np.random.default_rng(seed), n, SITE_RANGES))
+
+if __name__ == "__main__":
+    # Bit-identical check over several seeds
+    for seed in SEEDS:
+        sites = random_sites(100000, seed)
+        scalar = np.array([calculate_efficiency(*site) for site in zip(*(column.tolist() for column in sites))])
+        batch = calculate_efficiency_batch(*sites)
+        assert np.array_equal(scalar.view(np.int64), batch.view(np.int64)), f"Batch scores differ from the scalar function (seed {seed})"
+        clamped = np.mean((batch == 0) | (batch == 100))
+        print(f"Seed {seed}: bit-identical for 100000 sites ({clamped:.1%} clamped)")
+    print()
+
+    print(f"{'sites':>10} {'scalar (sites/s)':>18} {'batch (sites/s)':>18} {'speed-up':>10}")
+    for n in [10, 100, 1000, 10000, 100000, 1000000]:
+        sites = random_sites(n)
+        rows = list(zip(*(column.tolist() for column in sites)))
+        scalar_time = best_time(lambda: [calculate_efficiency(*site) for site in rows]) if n <= 100000 else None
+        batch_time = best_time(lambda: calculate_efficiency_batch(*sites))
+        scalar_rate = f"{n / scalar_time:,.0f}" if scalar_time else "-"
+        speed_up = f"{scalar_time / batch_time:,.1f}x" if scalar_time else "-"
+        print(f"{n:>10} {scalar_rate:>18} {n / batch_time:>18,.0f} {speed_up:>10}")
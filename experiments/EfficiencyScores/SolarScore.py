@@ -1,6 +1,15 @@
+import os
+import sys
+
 import requests
 import numpy as np
-from geopy import distance
+
+# Make the shared modules in experiments/ importable when running this script directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Elevation import get_elevations, get_terrain
+from NasaPower import get_parameters, get_power_data
+from PowerSeries import PowerSeries
 
 API_KEY = ""
 
@@ -8,21 +17,10 @@ lat, lon = 38.122636, 21.682841
 
 # Function to get data from NASA POWER API
 def get_nasa_power_data(lat, lon, start_date, end_date, parameters):
-    base_url = "https://power.larc.nasa.gov/api/temporal/monthly/point"
-    params = {
-        "latitude": lat,
-        "longitude": lon,
-        "start": start_date,
-        "end": end_date,
-        "parameters": ",".join(parameters),
-        "community": "RE",
-        "format": "JSON"
-    }
-    response = requests.get(base_url, params=params)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        print(f"Failed to get data: {response.status_code}")
+    try:
+        return get_power_data(lat, lon, start_date, end_date, parameters)
+    except requests.exceptions.HTTPError as e:
+        print(f"Failed to get data: {e.response.status_code}")
         return None
 
 # Function to calculate the efficiency score
@@ -34,7 +32,8 @@ def calculate_efficiency(temp, cloud, solar, elevation, slope):
     # elevation_weight = 0.1
 
     # Normalize the parameters
-    temp_norm = 1/(1+0.1*((temp-25)**2))  # Assuming optimal temp ~ 25°C
+    temp_diff = temp-25
+    temp_norm = 1/(1+0.1*(temp_diff*temp_diff))  # Assuming optimal temp ~ 25°C
     cloud_norm = (100 - cloud) / 100  # Lower cloud = better
     solar_norm = solar / 1000  # Max solar radiance ~ 1000 W/m²
     # elevation_norm = (elevation + 500) / 1000 if elevation<=500 else 1 # Higher elevation generally better
@@ -53,93 +52,91 @@ def calculate_efficiency(temp, cloud, solar, elevation, slope):
         efficiency_score = efficiency_score - 10
     return max(0, min(100, efficiency_score))  # Clamp between 0 and 100
 
-def get_elevation(lat, lon):
-    url = f"https://maps.googleapis.com/maps/api/elevation/json?locations={lat},{lon}&key={API_KEY}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        result = response.json()
-        if result['status'] == 'OK':
-            elevation = result['results'][0]['elevation']
-            return elevation
-        else:
-            print(f"Error in API response: {result['status']}")
-    else:
-        print("Failed to connect to the Google Maps API.")
-    return None
+# Function to calculate the efficiency score for many sites at once
+def calculate_efficiency_batch(temp, cloud, solar, elevation, slope):
+    """
+    Vectorized calculate_efficiency over equal-length arrays. Every step uses the same
+    operations in the same order as the scalar function, so the scores are bit-identical.
+    """
+    temp = np.asarray(temp, dtype=float)
+    cloud = np.asarray(cloud, dtype=float)
+    solar = np.asarray(solar, dtype=float)
+    slope = np.asarray(slope, dtype=float)
+
+    temp_weight = 0.23
+    cloud_weight = 0.34
+    solar_weight = 0.43
 
+    # Squared as d*d in both functions: a Python float ** calls pow(), NumPy's ** a multiply
+    temp_diff = temp-25
+    temp_norm = 1/(1+0.1*(temp_diff*temp_diff))
+    cloud_norm = (100 - cloud) / 100
+    solar_norm = solar / 1000
 
+    efficiency_score = (
+        (temp_norm * temp_weight) +
+        (cloud_norm * cloud_weight) +
+        (solar_norm * solar_weight)
+    ) * 100
+
+    efficiency_score = np.select(
+        [slope > 20, slope > 15],
+        [efficiency_score - 20, efficiency_score - 10],
+        efficiency_score
+    )
+    # Same comparisons as max(0, min(100, score)), including how NaN falls through
+    efficiency_score = np.where(efficiency_score < 100, efficiency_score, 100.0)
+    return np.where(efficiency_score > 0, efficiency_score, 0.0)
+
+# Function to score a table of sites (structured array or DataFrame with temp, cloud, solar, elevation and slope columns)
+def calculate_efficiency_table(sites):
+    return calculate_efficiency_batch(sites["temp"], sites["cloud"], sites["solar"], sites["elevation"], sites["slope"])
 
-# Function to calculate a new point by moving north by a given distance
-def move_north(point, distance_m):
-    lat, lon = point
-    # Approximate change in latitude for 1 meter of movement
-    delta_lat = distance_m / 111320  # 1 degree latitude ≈ 111.32 km
-    new_lat = lat + delta_lat
-    new_point = (new_lat, lon)
-    return new_point
+def get_elevation(lat, lon):
+    return get_elevations([(lat, lon)], API_KEY)[0]
 
 # Distance to move in meters (e.g., 100 meters)
 move_distance = 100
 
 def get_slope(lat, lon, move_distance):
-    # Generate Point 2 by moving north
-    point1 = (lat, lon) 
-    point2 = move_north(point1, move_distance)
-
-    lat, lon = 38.122636, 21.682841
-
-    elevation1 = get_elevation(*point1)
-    elevation2 = get_elevation(*point2)
-
-    # Calculate horizontal distance between the two points
-    horizontal_distance = distance.distance(point1, point2).meters  # Distance in meters
-    # print(f"Horizontal Distance: {horizontal_distance} meters")
-
-    # Calculate slope
-    if elevation1 is not None and elevation2 is not None:
-        delta_elevation = elevation2 - elevation1
-        slope = abs((delta_elevation / horizontal_distance) * 100)  # Slope as a percentage
+    # Elevations north, south, east and west of the site come back in a single batched request
+    slope = get_terrain([(lat, lon)], move_distance, API_KEY)[0]["slope"]
+    if slope is not None:
         print(f"Slope: {slope:.2f}%")
-        return slope
     else:
         print("Unable to calculate slope due to missing elevation data.")
-        return None
-
-# Date calculations for past 3 years
-start_date = 2020
-end_date = 2022
-
-# Parameters to retrieve
-parameters = [
-    "T2M",       # Mean temperature
-    "CLOUD_AMT",    # Cloud coverage
-    "ALLSKY_SFC_SW_DWN",  # Solar radiance
-]
-
-# Get data from NASA POWER API
-data = get_nasa_power_data(lat, lon, start_date, end_date, parameters)
-
-if data:
-    # Extracting required data
-    temp_data = np.array([float(v) for v in data['properties']['parameter']['T2M'].values()])
-    cloud_data = np.array([float(v) for v in data['properties']['parameter']['CLOUD_AMT'].values()])
-    solar_data = np.array([float(v) for v in data['properties']['parameter']['ALLSKY_SFC_SW_DWN'].values()])
-    elevation = get_elevation(lat, lon)
-    slope = get_slope(lat, lon, move_distance)
-
-    # Calculate means
-    mean_temp = np.mean(temp_data)
-    mean_cloud = np.mean(cloud_data)
-    mean_solar = np.mean(solar_data)
-
-    # Calculate efficiency score
-    efficiency_score = calculate_efficiency(mean_temp, mean_cloud, mean_solar, elevation, slope)
-
-    # Output results
-    print("\n--- Solar Panel Efficiency Report ---")
-    print(f"Mean Temperature: {mean_temp:.2f} °C")
-    print(f"Mean Cloud Coverage: {mean_cloud:.2f} %")
-    print(f"Mean Solar Radiance: {mean_solar:.2f} W/m²")
-    print(f"Slope: {slope:.2f}%")   
-    # print(f"Elevation: {elevation:.2f} m")
-    print(f"Estimated Solar Panel Efficiency: {efficiency_score:.2f} %")
\ No newline at end of file
+    return slope
+
+if __name__ == "__main__":
+    # Date calculations for past 3 years
+    start_date = 2020
+    end_date = 2022
+
+    # Parameters to retrieve: mean temperature, cloud coverage and solar radiance
+    parameters = get_parameters(["temperature", "cloud_amount", "solar_irradiance"])
+
+    # Get data from NASA POWER API
+    data = get_nasa_power_data(lat, lon, start_date, end_date, parameters)
+
+    if data:
+        # Extracting required data (monthly values; the annual 'YYYY13' values are kept apart)
+        series = PowerSeries.from_responses([data], parameters)
+        # Elevation and slope for the site from one batched Elevation API request
+        terrain = get_terrain([(lat, lon)], move_distance, API_KEY)[0]
+        elevation = terrain["elevation"]
+        slope = terrain["slope"]
+
+        # Calculate means
+        mean_temp, mean_cloud, mean_solar = series.mean()[0]
+
+        # Calculate efficiency score
+        efficiency_score = calculate_efficiency(mean_temp, mean_cloud, mean_solar, elevation, slope)
+
+        # Output results
+        print("\n--- Solar Panel Efficiency Report ---")
+        print(f"Mean Temperature: {mean_temp:.2f} °C")
+        print(f"Mean Cloud Coverage: {mean_cloud:.2f} %")
+        print(f"Mean Solar Radiance: {mean_solar:.2f} W/m²")
+        print(f"Slope: {slope:.2f}%")   
+        # print(f"Elevation: {elevation:.2f} m")
+        print(f"Estimated Solar Panel Efficiency: {efficiency_score:.2f} %")
@@ -0,0 +1,172 @@
+# Description: Batched Google Elevation API service. Packs the points of many sites into as few
+# requests as possible (up to 512 locations each), caches elevations by rounded coordinate and
+# derives slope and aspect from a small cross of points sampled around each site.
+
+import math
+import os
+
+import numpy as np
+
+from DiskCache import CACHE_DIR, DiskCache, make_key
+from FetchEngine import fetch_all, send
+
+API_KEY = ""
+
+ELEVATION_URL = "https://maps.googleapis.com/maps/api/elevation/json"
+
+# The Elevation API accepts up to 512 locations per request; the URL itself must stay below 16384 characters
+MAX_LOCATIONS = 512
+MAX_URL_LENGTH = 16000
+
+# Coordinates are rounded to 5 decimals (~1 m) for requests and cache keys
+COORDINATE_DECIMALS = 5
+
+METERS_PER_DEGREE_LAT = 111320  # 1 degree latitude ≈ 111.32 km
+
+_elevation_cache = None
+
+# Function to get the shared on-disk cache for elevations
+def get_elevation_cache():
+    global _elevation_cache
+    if _elevation_cache is None:
+        _elevation_cache = DiskCache(os.environ.get("ELEVATION_CACHE_PATH", os.path.join(CACHE_DIR, "elevation.sqlite")))
+    return _elevation_cache
+
+def _round_point(lat, lon):
+    return round(lat, COORDINATE_DECIMALS), round(lon, COORDINATE_DECIMALS)
+
+# Function to split points into location lists that fit in one request each
+def chunk_locations(points):
+    chunks, chunk, length = [], [], 0
+    for lat, lon in points:
+        location = f"{lat},{lon}"
+        if chunk and (len(chunk) == MAX_LOCATIONS or length + len(location) + 1 > MAX_URL_LENGTH):
+            chunks.append(chunk)
+            chunk, length = [], 0
+        chunk.append((lat, lon))
+        length += len(location) + 1
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+# Function to get the elevations (meters) of many points with as few requests as possible
+def get_elevations(points, api_key=None, use_cache=True, **engine_options):
+    """
+    points is a list of (lat, lon). Returns a list of elevations in the same order;
+    points whose request failed get None.
+    """
+    api_key = api_key or API_KEY
+    rounded = [_round_point(lat, lon) for lat, lon in points]
+    elevations = {}
+    missing = []
+    for point in dict.fromkeys(rounded):
+        elevation = get_elevation_cache().get_json(make_key("elevation", *point)) if use_cache else None
+        if elevation is not None:
+            elevations[point] = elevation
+        else:
+            missing.append(point)
+
+    chunks = chunk_locations(missing)
+    batch = [
+        {
+            "provider": "google_elevation",
+            "url": ELEVATION_URL,
+            "params": {"locations": "|".join(f"{lat},{lon}" for lat, lon in chunk), "key": api_key},
+        }
+        for chunk in chunks
+    ]
+    for chunk, result in zip(chunks, fetch_all(batch, **engine_options)):
+        if isinstance(result, Exception):
+            print(f"Failed to connect to the Google Maps API: {result}")
+            continue
+        if result['status'] != 'OK':
+            print(f"Error in API response: {result['status']}")
+            continue
+        for point, location in zip(chunk, result['results']):
+            elevations[point] = location['elevation']
+            if use_cache:
+                get_elevation_cache().put_json(make_key("elevation", *point), location['elevation'])
+
+    return [elevations.get(point) for point in rounded]
+
+# Function to get the elevation of a single point
+def get_elevation(lat, lon, api_key=None):
+    return get_elevations([(lat, lon)], api_key)[0]
+
+# Function to sample elevations evenly along a path in one request (path/samples mode)
+def get_elevation_path(start, end, samples, api_key=None):
+    """
+    Returns a list of (lat, lon, elevation) for samples points from start to end, or None on failure.
+    """
+    params = {
+        "path": f"{start[0]},{start[1]}|{end[0]},{end[1]}",
+        "samples": samples,
+        "key": api_key or API_KEY,
+    }
+    response = send("google_elevation", ELEVATION_URL, params)
+    if response.status_code != 200:
+        print("Failed to connect to the Google Maps API.")
+        return None
+    result = response.json()
+    if result['status'] != 'OK':
+        print(f"Error in API response: {result['status']}")
+        return None
+    return [(r['location']['lat'], r['location']['lng'], r['elevation']) for r in result['results']]
+
+# Function to build the cross of points (centre, north, south, east, west) sampled around each site
+def terrain_cross(sites, distance_m):
+    sites = np.asarray(sites, dtype=float).reshape(-1, 2)
+    lat, lon = sites[:, 0], sites[:, 1]
+    delta_lat = distance_m / METERS_PER_DEGREE_LAT
+    delta_lon = distance_m / (METERS_PER_DEGREE_LAT * np.cos(np.radians(lat)))
+    cross_lat = np.stack([lat, lat + delta_lat, lat - delta_lat, lat, lat], axis=1)
+    cross_lon = np.stack([lon, lon, lon, lon + delta_lon, lon - delta_lon], axis=1)
+    return cross_lat, cross_lon
+
+# Function to compute slope (%) and aspect (degrees clockwise from north) from cross elevations
+def slope_aspect_from_cross(cross_elevations, distance_m):
+    """
+    cross_elevations has shape (sites, 5) in the order centre, north, south, east, west.
+    Aspect is the direction the slope faces (downhill) and NaN on flat ground.
+    """
+    z = np.asarray(cross_elevations, dtype=float)
+    dz_dy = (z[:, 1] - z[:, 2]) / (2 * distance_m)
+    dz_dx = (z[:, 3] - z[:, 4]) / (2 * distance_m)
+    slope = np.hypot(dz_dx, dz_dy) * 100
+    aspect = np.degrees(np.arctan2(-dz_dx, -dz_dy)) % 360
+    aspect = np.where(slope == 0, np.nan, aspect)
+    return slope, aspect
+
+# Function to get elevation, slope and aspect for many sites in as few requests as possible
+def get_terrain(sites, distance_m=100, api_key=None, **engine_options):
+    """
+    Samples a cross of five points around every site (all sites packed into the same requests).
+    Returns a list of dicts with elevation (m), slope (%) and aspect (degrees); values are None
+    when an elevation is missing.
+    """
+    cross_lat, cross_lon = terrain_cross(sites, distance_m)
+    points = list(zip(cross_lat.ravel().tolist(), cross_lon.ravel().tolist()))
+    elevations = get_elevations(points, api_key, **engine_options)
+    z = np.array([np.nan if e is None else e for e in elevations]).reshape(-1, 5)
+    slope, aspect = slope_aspect_from_cross(z, distance_m)
+
+    terrain = []
+    for elevation, site_slope, site_aspect in zip(z[:, 0], slope, aspect):
+        terrain.append({
+            "elevation": None if math.isnan(elevation) else float(elevation),
+            "slope": None if math.isnan(site_slope) else float(site_slope),
+            "aspect": None if math.isnan(site_aspect) else float(site_aspect),
+        })
+    return terrain
+
+# Function to get the slope (%) at a site from a single batched request
+def get_slope(lat, lon, move_distance=100, api_key=None):
+    return get_terrain([(lat, lon)], move_distance, api_key)[0]["slope"]
+
+
+if __name__ == "__main__":
+    # Example usage: terrain for a few sites in one request
+    sites = [(39.074208, 21.824312), (38.122636, 21.682841), (37.98, 23.73)]
+    for (lat, lon), terrain in zip(sites, get_terrain(sites)):
+        print(f"({lat}, {lon}): {terrain}")
+    print("Elevation cache:", get_elevation_cache().stats())
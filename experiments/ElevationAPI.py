@@ -1,13 +1,13 @@
 # Description: This script uses the Google Elevation API to get the elevation of a specific location.
 
-import requests
+from FetchEngine import send
 
 API_KEY = ""
 latitude = 39.074208
 longitude = 21.824312
 url = f"https://maps.googleapis.com/maps/api/elevation/json?locations={latitude},{longitude}&key={API_KEY}"
 
-response = requests.get(url)
+response = send("google_elevation", url)
 data = response.json()
 
 if data["status"] == "OK":
@@ -0,0 +1,341 @@
+# Description: Columnar feature store for per-site derived metrics (annual mean temperature, cloud amount,
+# irradiance, wind speeds, air density, turbulence, rainfall, slope, land cover, grid/road proximity, ...).
+# Every feature is kept in Parquet files keyed by site ID and POWER grid cell, versioned by data source
+# and date range, and updated incrementally, so the dashboard and scorers can read precomputed values.
+# The metrics of METRICS are read through the store: stored values are returned and only the missing
+# sites are computed and written back.
+
+import datetime
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import requests
+
+from NasaPower import get_site_power_data_batch, snap_to_power_grid
+
+FEATURE_STORE_PATH = os.environ.get("FEATURE_STORE_PATH", "feature_store")
+
+# Function to build the version name of a feature computed from a source over a date range
+def version_name(source, start, end):
+    return re.sub(r"[^A-Za-z0-9_.-]", "-", f"{source}_{start}_{end}")
+
+class FeatureStore:
+    """
+    Layout: <root>/<feature>/<version>.parquet with columns site_id, lat, lon, cell_lat, cell_lon
+    and value (a number or a list, e.g. monthly values), plus <root>/<feature>/versions.json
+    recording the source, date range and last update of each version.
+    """
+
+    def __init__(self, root=FEATURE_STORE_PATH):
+        self.root = root
+
+    def _feature_dir(self, feature):
+        return os.path.join(self.root, feature)
+
+    def _manifest_path(self, feature):
+        return os.path.join(self._feature_dir(feature), "versions.json")
+
+    def versions(self, feature):
+        path = self._manifest_path(feature)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as file:
+            return json.load(file)
+
+    def find_version(self, feature, source=None, start=None, end=None):
+        """
+        Name of the stored version of a feature for a data source and date range. Fields left as None
+        match any version; among several matches the one with the latest date range (by end, then start)
+        is returned, whatever order they were written in. Raises KeyError when no version matches or
+        the matches come from more than one source.
+        """
+        matches = {
+            name: info for name, info in self.versions(feature).items()
+            if (source is None or info["source"] == source)
+            and (start is None or info["start"] == str(start))
+            and (end is None or info["end"] == str(end))
+        }
+        if not matches:
+            raise KeyError(f"No stored version of {feature} for source={source}, start={start}, end={end}")
+        sources = {info["source"] for info in matches.values()}
+        if len(sources) > 1:
+            raise KeyError(f"Feature {feature} is stored from several sources ({', '.join(sorted(sources))}), pass source")
+        return max(matches, key=lambda name: (matches[name]["end"], matches[name]["start"]))
+
+    def write(self, feature, rows, source, start, end):
+        """
+        Inserts or replaces the values of some sites for one version of a feature.
+        rows is a DataFrame (or list of dicts) with site_id, lat, lon and value;
+        sites already stored for the same version are overwritten, others are kept.
+        """
+        rows = pd.DataFrame(rows)[["site_id", "lat", "lon", "value"]].copy()
+        rows["site_id"] = rows["site_id"].astype(str)
+        cells = [snap_to_power_grid(lat, lon) for lat, lon in zip(rows["lat"], rows["lon"])]
+        rows["cell_lat"] = [cell[0] for cell in cells]
+        rows["cell_lon"] = [cell[1] for cell in cells]
+
+        version = version_name(source, start, end)
+        os.makedirs(self._feature_dir(feature), exist_ok=True)
+        path = os.path.join(self._feature_dir(feature), f"{version}.parquet")
+        if os.path.exists(path):
+            existing = pd.read_parquet(path)
+            rows = pd.concat([existing[~existing["site_id"].isin(rows["site_id"])], rows], ignore_index=True)
+
+        # Write to a temporary file first so readers never see a half-written version
+        temporary = path + ".tmp"
+        rows.to_parquet(temporary, index=False)
+        os.replace(temporary, path)
+
+        versions = self.versions(feature)
+        versions[version] = {
+            "source": source,
+            "start": str(start),
+            "end": str(end),
+            "updated": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }
+        with open(self._manifest_path(feature), "w") as file:
+            json.dump(versions, file, indent=2)
+        return version
+
+    def read(self, feature, site_ids=None, version=None, source=None, start=None, end=None):
+        # Rows of one version of a feature (chosen by find_version unless given), optionally for some sites
+        version = version or self.find_version(feature, source, start, end)
+        filters = [("site_id", "in", [str(site_id) for site_id in site_ids])] if site_ids is not None else None
+        return pd.read_parquet(os.path.join(self._feature_dir(feature), f"{version}.parquet"), filters=filters)
+
+    def read_cell(self, feature, lat, lon, version=None, source=None, start=None, end=None):
+        # Rows of every site in the POWER grid cell containing (lat, lon)
+        cell_lat, cell_lon = snap_to_power_grid(lat, lon)
+        version = version or self.find_version(feature, source, start, end)
+        filters = [("cell_lat", "==", cell_lat), ("cell_lon", "==", cell_lon)]
+        return pd.read_parquet(os.path.join(self._feature_dir(feature), f"{version}.parquet"), filters=filters)
+
+    def missing(self, feature, site_ids, version=None, source=None, start=None, end=None):
+        # Site IDs that still need to be computed for a feature version (for incremental updates)
+        site_ids = [str(site_id) for site_id in site_ids]
+        try:
+            stored = set(self.read(feature, site_ids, version, source, start, end)["site_id"])
+        except (KeyError, FileNotFoundError):
+            return site_ids
+        return [site_id for site_id in site_ids if site_id not in stored]
+
+    def read_features(self, features, site_ids=None, versions=None, start=None, end=None):
+        """
+        Wide table indexed by site_id with one column per feature (the versions chosen by find_version
+        for start and end unless versions maps feature -> version), ready for ScoringEngine.rescore
+        or the dashboard.
+        """
+        versions = versions or {}
+        table = None
+        for feature in features:
+            column = self.read(feature, site_ids, versions.get(feature), start=start, end=end).set_index("site_id")
+            if table is None:
+                table = column[["lat", "lon", "cell_lat", "cell_lon"]].copy()
+            table = table.join(column["value"].rename(feature), how="outer")
+        return table
+
+    def get_or_compute(self, feature, sites, site_ids, compute, source, start, end):
+        """
+        Read-through/write-back access to one version of a feature. Values stored for (source, start, end)
+        are read; the missing sites are computed with compute(sites), which takes a list of (lat, lon) and
+        returns one value per site, and written back. Returns one value per site in order. Sites whose
+        value comes back None are not stored, so they are computed again next time.
+        """
+        site_ids = [str(site_id) for site_id in site_ids]
+        version = version_name(source, start, end)
+        stored = {}
+        if version in self.versions(feature):
+            rows = self.read(feature, site_ids, version)
+            stored = {site_id: value.tolist() if hasattr(value, "tolist") else value for site_id, value in zip(rows["site_id"], rows["value"])}
+
+        missing = [index for index, site_id in enumerate(site_ids) if site_id not in stored]
+        if missing:
+            values = compute([sites[index] for index in missing])
+            rows = [
+                {"site_id": site_ids[index], "lat": sites[index][0], "lon": sites[index][1], "value": value}
+                for index, value in zip(missing, values) if value is not None
+            ]
+            if rows:
+                self.write(feature, rows, source, start, end)
+            for index, value in zip(missing, values):
+                stored[site_ids[index]] = value
+        return [stored[site_id] for site_id in site_ids]
+
+    def get_metric(self, feature, sites, site_ids, start, end, **options):
+        # Values of a metric of METRICS through the store (see get_or_compute); options go to its compute
+        # function (dem, move_distance, worldcover, road_index, power_index) and into its source
+        source, compute = METRICS[feature]
+        if callable(source):
+            source = source(**options)
+        return self.get_or_compute(feature, sites, site_ids, lambda missing: compute(missing, start, end, **options), source, start, end)
+
+# Function to apply extract(lat, lon, data) to the POWER response of every site, fetched once per grid cell
+def map_power_responses(sites, start, end, extract):
+    responses = get_site_power_data_batch(sites, start, end)
+    return [None if data is None else extract(lat, lon, data) for (lat, lon), data in zip(sites, responses)]
+
+# Function to compute the annual mean temperature (°C) of many sites
+def metric_temperature(sites, start, end, **options):
+    from Solar.Temperature import calculate_annual_mean_temperature, get_temperature_data
+
+    def extract(lat, lon, data):
+        temperature = get_temperature_data(lat, lon, start, end, data=data)
+        return None if temperature is None else calculate_annual_mean_temperature(temperature)
+
+    return map_power_responses(sites, start, end, extract)
+
+# Function to compute the mean solar irradiance (kWh/m²/day) of many sites
+def metric_solar_irradiance(sites, start, end, **options):
+    from PowerSeries import PowerSeries
+
+    def extract(lat, lon, data):
+        mean = PowerSeries.from_responses([data], ["ALLSKY_SFC_SW_DWN"]).mean()[0, 0]
+        return None if np.isnan(mean) else float(mean)
+
+    return map_power_responses(sites, start, end, extract)
+
+# Function to compute the annual mean cloud amount (%) of many sites
+def metric_cloud_amount(sites, start, end, **options):
+    from Solar.CloudCover import get_annual_mean_cloud_amount
+    return map_power_responses(sites, start, end, lambda lat, lon, data: get_annual_mean_cloud_amount(lat, lon, start, end, data=data))
+
+# Function to compute the overall mean wind speed (m/s) at 10m of many sites
+def metric_wind_speed_10m(sites, start, end, **options):
+    from Wind.WindSpeed import get_wind_speed_10m
+
+    def extract(lat, lon, data):
+        summary = get_wind_speed_10m(lat, lon, start, end, data=data)
+        return None if summary is None else summary[1]
+
+    return map_power_responses(sites, start, end, extract)
+
+# Function to compute the overall mean wind speed (m/s) at 50m of many sites
+def metric_wind_speed_50m(sites, start, end, **options):
+    from Wind.WindSpeed import get_wind_speed_50m
+
+    def extract(lat, lon, data):
+        summary = get_wind_speed_50m(lat, lon, start, end, data=data)
+        return None if summary is None else summary[1]
+
+    return map_power_responses(sites, start, end, extract)
+
+# Function to compute the mean monthly air density (kg/m³) of many sites
+def metric_air_density(sites, start, end, **options):
+    from PowerSeries import PowerSeries
+    from Wind.AirDensity import get_air_density
+
+    def extract(lat, lon, data):
+        density = get_air_density(lat, lon, start, end, data=data)
+        if not density:
+            return None
+        # The annual 'YYYY13' values are left out of the mean
+        mean = PowerSeries.from_series(density).mean()[0, 0]
+        return None if np.isnan(mean) else float(mean)
+
+    return map_power_responses(sites, start, end, extract)
+
+# Function to compute the seasonal rainfall totals (mm, in the order of PowerSeries.SEASONS) of many sites
+def metric_rainfall(sites, start, end, **options):
+    from Hydropower.Rainfall import aggregate_seasonal_precipitation, get_monthly_precipitation
+
+    def extract(lat, lon, data):
+        return list(aggregate_seasonal_precipitation(get_monthly_precipitation(lat, lon, start, end, data=data), lat).values())
+
+    return map_power_responses(sites, start, end, extract)
+
+# Function to compute the mean daily turbulence intensity (%) of many sites; start and end are 'YYYYMMDD' dates
+def metric_wind_turbulence(sites, start, end, **options):
+    from Wind.WindTurbulence import calculate_daily_turbulence_streaming, iter_hourly_wind_data
+
+    values = []
+    for lat, lon in sites:
+        try:
+            daily_ti = calculate_daily_turbulence_streaming(iter_hourly_wind_data(lat, lon, str(start), str(end)))
+        except requests.exceptions.RequestException as e:
+            print(f"Request Error for ({lat}, {lon}): {e}")
+            daily_ti = {}
+        values.append(float(np.mean(list(daily_ti.values()))) if daily_ti else None)
+    return values
+
+# Function to compute the slope (%) of many sites, from a local DemRaster when dem is given
+def metric_slope(sites, start, end, dem=None, move_distance=100, **options):
+    if dem is not None:
+        terrain = dem.get_terrain(sites, move_distance)
+    else:
+        from Elevation import get_terrain
+        terrain = get_terrain(sites, move_distance)
+    return [site["slope"] for site in terrain]
+
+# Function to get the ESA WorldCover class of many sites, from a local WorldCover when worldcover is given
+def metric_land_cover(sites, start, end, worldcover=None, **options):
+    if worldcover is not None:
+        codes = worldcover.sample_land_cover(sites)["code"]
+    else:
+        from LandCover import sample_land_cover
+        codes = sample_land_cover(sites)["code"]
+    # 0 means no data or a failed request, so it is not stored
+    return [int(code) if code else None for code in codes]
+
+# Function to compute the distance (m) from many sites to the nearest grid infrastructure
+def metric_grid_distance(sites, start, end, **options):
+    from GridAvailability import get_grid_distances
+    # NaN marks a failed Overpass request
+    return [None if np.isnan(distance) else float(distance) for distance in get_grid_distances(sites)["distance"]]
+
+# Function to compute the distance (m) from many sites to the nearest road, from the local OSM indexes
+def metric_road_distance(sites, start, end, road_index=None, power_index=None, **options):
+    from RoadsNearby import get_road_proximity
+    proximity = get_road_proximity([lat for lat, _ in sites], [lon for _, lon in sites], road_index, power_index)
+    return [float(distance) for distance in proximity["road_distance"]]
+
+# Sources of the metrics whose values depend on the backend and options, so each combination is its own version
+def slope_source(dem=None, move_distance=100, **options):
+    return f"terrain-{'dem' if dem is not None else 'google'}-{move_distance}m"
+
+def land_cover_source(worldcover=None, **options):
+    return f"esa-worldcover-{'local' if worldcover is not None else 'earth-engine'}"
+
+# Metrics available through FeatureStore.get_metric: feature -> (source, compute(sites, start, end, **options));
+# source is a name or a function of the options
+METRICS = {
+    "temperature": ("nasa-power-monthly", metric_temperature),
+    "cloud_amount": ("nasa-power-monthly", metric_cloud_amount),
+    "solar_irradiance": ("nasa-power-monthly", metric_solar_irradiance),
+    "wind_speed_10m": ("nasa-power-monthly", metric_wind_speed_10m),
+    "wind_speed_50m": ("nasa-power-monthly", metric_wind_speed_50m),
+    "air_density": ("nasa-power-monthly", metric_air_density),
+    "rainfall": ("nasa-power-monthly", metric_rainfall),
+    "wind_turbulence": ("nasa-power-hourly", metric_wind_turbulence),
+    "slope": (slope_source, metric_slope),
+    "land_cover": (land_cover_source, metric_land_cover),
+    "grid_distance": ("overpass", metric_grid_distance),
+    "road_distance": ("osm", metric_road_distance),
+}
+
+
+if __name__ == "__main__":
+    from ScoringEngine import rescore
+
+    # Example usage: compute features for a batch of sites once, then score from the store
+    start_year, end_year = 2020, 2022
+    sites = [(37.9 + 0.05 * i, 23.6 + 0.05 * j) for i in range(5) for j in range(5)]
+    site_ids = [f"athens-{index}" for index in range(len(sites))]
+    store = FeatureStore()
+
+    # Metrics are read through the store: only sites not stored yet are computed (sites whose POWER
+    # request failed come back None and are left for the next run)
+    metrics = {"temp": "temperature", "cloud": "cloud_amount", "solar": "solar_irradiance"}
+    for metric in metrics.values():
+        store.get_metric(metric, sites, site_ids, start_year, end_year)
+    wind = store.get_metric("wind_speed_50m", sites, site_ids, start_year, end_year)
+    print(f"Mean wind speed at 50m over {sum(value is not None for value in wind)} sites: {np.nanmean(np.array(wind, dtype=float)):.2f} m/s")
+
+    # The scoring profiles name their features temp/cloud/solar/slope
+    table = store.read_features(list(metrics.values()), site_ids, start=start_year, end=end_year)
+    table = table.rename(columns={metric: feature for feature, metric in metrics.items()})
+    table["slope"] = 0.0
+    table["score"] = rescore(table, "solar/default")
+    print(table.head())
@@ -0,0 +1,225 @@
+# Description: Shared HTTP layer for the NASA POWER, Google Elevation, Google Places, Static Maps and
+# Overpass callers. Keeps one pooled connection set per host, runs batches of requests concurrently
+# under a global cap, applies a token-bucket rate limit per provider and retries 429/5xx responses
+# with jittered exponential backoff. Provider limits are shared by every engine, thread and event loop
+# of the process, so concurrent batches stay within one quota.
+
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+
+# Rate limits (requests per second, burst size) and concurrency per provider, tuned to their quotas
+PROVIDERS = {
+    "power": {"rate": 5, "burst": 5, "concurrency": 5},                # NASA POWER asks for modest parallelism
+    "google_elevation": {"rate": 50, "burst": 50, "concurrency": 20},  # 3000 QPM per project
+    "google_places": {"rate": 10, "burst": 10, "concurrency": 10},
+    "google_static_maps": {"rate": 50, "burst": 50, "concurrency": 20},
+    "overpass": {"rate": 0.5, "burst": 2, "concurrency": 2},           # public instances allow ~2 slots
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Seconds between attempts to take a provider slot held by another thread or event loop
+SLOT_POLL = 0.01
+
+# Pooled blocking sessions, one per host, for the scripts that fetch one request at a time
+_sessions = {}
+
+# Function to get the pooled requests session for the host of a URL
+def get_session(url):
+    host = urlsplit(url).netloc
+    if host not in _sessions:
+        _sessions[host] = requests.Session()
+    return _sessions[host]
+
+class TokenBucket:
+    """
+    Allows rate requests per second on average with bursts of up to burst requests.
+    Thread-safe and not tied to an event loop: a caller reserves a token under a lock
+    (the bucket may go into debt) and then sleeps until its token is due.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        # Takes one token and returns the seconds to wait before using it
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+class ProviderLimiter:
+    """
+    Limits of one provider: a token bucket and a cap on the requests in flight.
+    Use as `async with limiter:` around a request, or `with limiter.hold():` in blocking code;
+    works from any thread and event loop.
+    """
+
+    def __init__(self, rate, burst, concurrency):
+        self.bucket = TokenBucket(rate, burst)
+        self._slots = threading.BoundedSemaphore(concurrency)
+
+    async def __aenter__(self):
+        while not self._slots.acquire(blocking=False):
+            await asyncio.sleep(SLOT_POLL)
+        try:
+            await self.bucket.acquire()
+        except BaseException:
+            self._slots.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._slots.release()
+
+    @contextmanager
+    def hold(self):
+        # Blocking counterpart of `async with limiter:`
+        self._slots.acquire()
+        try:
+            delay = self.bucket.reserve()
+            if delay > 0:
+                time.sleep(delay)
+            yield self
+        finally:
+            self._slots.release()
+
+# Process-wide limiters for PROVIDERS, created on first use
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+# Function to get the process-wide limiter of a provider
+def get_limiter(provider):
+    with _limiters_lock:
+        if provider not in _limiters:
+            limits = PROVIDERS[provider]
+            _limiters[provider] = ProviderLimiter(limits["rate"], limits["burst"], limits["concurrency"])
+        return _limiters[provider]
+
+# Function to send one blocking request through the pooled session of its host, within the provider's limits
+def send(provider, url, params=None, method="GET", data=None):
+    """
+    For the scripts that fetch one request at a time. The request counts against the same process-wide
+    limits as the batches of fetch_all. Returns the requests.Response; status errors are left to the caller.
+    """
+    with get_limiter(provider).hold():
+        return get_session(url).request(method, url, params=params, data=data)
+
+class FetchEngine:
+    """
+    Asynchronous fetcher. Use as `async with FetchEngine() as engine:` and call
+    `await engine.request(provider, url, ...)` or `await engine.gather(batch)`.
+    max_concurrency caps the requests in flight of this engine across all providers. Provider limits
+    are the process-wide ones of PROVIDERS, unless providers gives limits private to this engine.
+    """
+
+    def __init__(self, max_concurrency=32, max_retries=4, backoff=1.0, max_backoff=60.0, timeout=60.0, providers=None):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        if providers is None:
+            self._limiters = {name: get_limiter(name) for name in PROVIDERS}
+        else:
+            self._limiters = {name: ProviderLimiter(p["rate"], p["burst"], p["concurrency"]) for name, p in providers.items()}
+        self._clients = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients = {}
+
+    def _client(self, url):
+        # One client, and therefore one connection pool, per host
+        host = urlsplit(url).netloc
+        if host not in self._clients:
+            self._clients[host] = httpx.AsyncClient(timeout=self.timeout, follow_redirects=True)
+        return self._clients[host]
+
+    def _retry_delay(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def request(self, provider, url, params=None, method="GET", data=None):
+        """
+        Sends one request and returns the httpx.Response.
+        Raises httpx.HTTPStatusError for error responses once retries are exhausted
+        and httpx.TransportError for connection failures.
+        """
+        client = self._client(url)
+        for attempt in range(self.max_retries + 1):
+            response = None
+            async with self._semaphore, self._limiters[provider]:
+                try:
+                    response = await client.request(method, url, params=params, data=data)
+                except httpx.TransportError:
+                    if attempt == self.max_retries:
+                        raise
+            if response is not None and (response.status_code not in RETRY_STATUSES or attempt == self.max_retries):
+                response.raise_for_status()
+                return response
+            await asyncio.sleep(self._retry_delay(attempt, response))
+
+    async def fetch(self, request, parse="json"):
+        response = await self.request(
+            request["provider"], request["url"], request.get("params"), request.get("method", "GET"), request.get("data")
+        )
+        if parse == "json":
+            return response.json()
+        return response.content
+
+    async def gather(self, batch, parse="json"):
+        # Results in request order; failed requests are returned as their exception
+        return await asyncio.gather(*(self.fetch(request, parse) for request in batch), return_exceptions=True)
+
+# Function to run a batch of requests concurrently from async code
+async def fetch_all_async(batch, parse="json", **engine_options):
+    # Same as fetch_all, awaited on the running event loop
+    async with FetchEngine(**engine_options) as engine:
+        return await engine.gather(batch, parse)
+
+# Function to run a batch of requests concurrently from blocking code
+def fetch_all(batch, parse="json", **engine_options):
+    """
+    batch is a list of request dicts with provider, url and optionally params, method and data.
+    parse is "json" for decoded JSON or "bytes" for the raw body.
+    Returns one result per request, in order; failed requests are returned as their exception.
+    Called from inside a running event loop (e.g. a notebook), the batch runs on its own loop in a
+    worker thread; async code should await fetch_all_async instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(fetch_all_async(batch, parse, **engine_options))
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, fetch_all_async(batch, parse, **engine_options)).result()
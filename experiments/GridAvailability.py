@@ -1,31 +1,56 @@
-import requests
+import math
 
-latitude, longitude = 37.749, 24.3587 
-radius = 1000  # 1 km radius
+import numpy as np
+
+from FetchEngine import fetch_all, send
+from OsmIndex import OsmIndex, densify
 
 # Overpass API URL
 overpass_url = "http://overpass-api.de/api/interpreter"
 
-# Overpass QL query to check for power infrastructure
-overpass_query = f"""
+# Power infrastructure that counts as grid
+POWER_FILTER = "substation|line|generator|pole|tower"
+
+radius = 1000  # 1 km radius
+
+METERS_PER_DEGREE_LAT = 111320  # 1 degree latitude ≈ 111.32 km
+
+# Function to build the Overpass QL query for power infrastructure around a point
+def get_overpass_query(latitude, longitude, radius=radius):
+    return f"""
 [out:json];
 (
-  node["power"~"substation|line|generator|pole|tower"](around:{radius},{latitude},{longitude});
-  way["power"~"substation|line|generator|pole|tower"](around:{radius},{latitude},{longitude});
-  relation["power"~"substation|line|generator|pole|tower"](around:{radius},{latitude},{longitude});
+  node["power"~"{POWER_FILTER}"](around:{radius},{latitude},{longitude});
+  way["power"~"{POWER_FILTER}"](around:{radius},{latitude},{longitude});
+  relation["power"~"{POWER_FILTER}"](around:{radius},{latitude},{longitude});
 );
 out body;
 """
 
-def check_grid_connectivity():
+# Function to build the Overpass QL query for power infrastructure with geometry in a bounding box
+def get_overpass_bbox_query(bbox):
+    south, west, north, east = bbox
+    box = f"{south},{west},{north},{east}"
+    return f"""
+[out:json][timeout:180];
+(
+  node["power"~"{POWER_FILTER}"]({box});
+  way["power"~"{POWER_FILTER}"]({box});
+  relation["power"~"{POWER_FILTER}"]({box});
+);
+out geom;
+"""
+
+def check_grid_connectivity(latitude, longitude, radius=radius):
     # Send the request to the Overpass API
-    response = requests.post(overpass_url, data={"data": overpass_query})
-    
+    overpass_query = get_overpass_query(latitude, longitude, radius)
+    response = send("overpass", overpass_url, method="POST", data={"data": overpass_query})
+
     # Check if the request was successful
     if response.status_code == 200:
         data = response.json()
         elements = data.get('elements', [])
-        
+
         # Check if any infrastructure is found
         if elements:
             print("Grid connectivity is AVAILABLE.")
@@ -37,10 +62,100 @@ def check_grid_connectivity():
         print("Failed to retrieve data. Status Code:", response.status_code)
         return False
 
-# Run the check
-grid_connectivity = check_grid_connectivity()
+# Function to group nearby sites into clusters, one grid cell of cell_degrees each
+def cluster_sites(sites, cell_degrees=0.1):
+    clusters = {}
+    for index, (lat, lon) in enumerate(sites):
+        cell = (math.floor(lat / cell_degrees), math.floor(lon / cell_degrees))
+        clusters.setdefault(cell, []).append(index)
+    return list(clusters.values())
+
+# Function to get the bounding box (south, west, north, east) of some sites, padded by a distance in meters
+def padded_bbox(sites, padding_m):
+    lats = [lat for lat, _ in sites]
+    lons = [lon for _, lon in sites]
+    pad_lat = padding_m / METERS_PER_DEGREE_LAT
+    pad_lon = padding_m / (METERS_PER_DEGREE_LAT * math.cos(math.radians(max(abs(min(lats)), abs(max(lats))))))
+    return (min(lats) - pad_lat, min(lons) - pad_lon, max(lats) + pad_lat, max(lons) + pad_lon)
+
+# Function to turn an Overpass 'out geom' response into an OsmIndex of the elements it returned
+def index_from_overpass(data):
+    lats, lons, features, feature_types, osm_types, osm_ids = [], [], [], [], [], []
+    for element in data.get('elements', []):
+        if element['type'] == 'node':
+            lines = [[element]]
+        elif element['type'] == 'way':
+            lines = [element.get('geometry', [])]
+        else:
+            lines = [member.get('geometry', []) for member in element.get('members', [])]
+            lines += [[member] for member in element.get('members', []) if member['type'] == 'node' and 'lat' in member]
+        points = [densify([p['lat'] for p in line], [p['lon'] for p in line]) for line in lines if line]
+        if not points:
+            continue
+        feature = len(feature_types)
+        feature_types.append(element.get('tags', {}).get('power', ''))
+        osm_types.append(element['type'][0])
+        osm_ids.append(element['id'])
+        for line_lats, line_lons in points:
+            lats.extend(line_lats)
+            lons.extend(line_lons)
+            features.extend([feature] * len(line_lats))
+    return OsmIndex(lats, lons, features, feature_types, osm_types, osm_ids)
+
+# Function to get the distance from many sites to the nearest grid infrastructure with one Overpass query per cluster
+def get_grid_distances(sites, search_radius=5000, cell_degrees=0.1, **engine_options):
+    """
+    Clusters nearby sites, sends one bounding-box query per cluster (padded by search_radius, concurrently
+    and rate limited through FetchEngine) and computes the per-site distances locally.
+    Returns a dict of arrays: distance (m, inf when nothing is within search_radius, NaN when the
+    cluster's request failed), type and osm_id of the nearest element, and available (within 1 km).
+    """
+    clusters = cluster_sites(sites, cell_degrees)
+    requests = [
+        {
+            "provider": "overpass",
+            "url": overpass_url,
+            "method": "POST",
+            "data": {"data": get_overpass_bbox_query(padded_bbox([sites[i] for i in cluster], search_radius))},
+        }
+        for cluster in clusters
+    ]
+    distance = np.full(len(sites), np.nan)
+    power_type = np.full(len(sites), "", dtype=object)
+    osm_id = np.full(len(sites), -1, dtype=np.int64)
+    for cluster, data in zip(clusters, fetch_all(requests, **engine_options)):
+        if isinstance(data, Exception):
+            print(f"Failed to retrieve data for {len(cluster)} sites: {data}")
+            continue
+        nearest = index_from_overpass(data).nearest(
+            [sites[i][0] for i in cluster], [sites[i][1] for i in cluster], max_distance=search_radius
+        )
+        distance[cluster] = nearest["distance"]
+        power_type[cluster] = nearest["type"]
+        osm_id[cluster] = nearest["osm_id"]
+    return {"distance": distance, "type": power_type, "osm_id": osm_id, "available": distance <= radius}
+
+# Function to grade distances to the grid from 1 (next to it) down to 0 (beyond the last threshold)
+def grade_grid_distance(distance, thresholds=(1000, 2000, 5000)):
+    distance = np.asarray(distance, dtype=float)
+    grade = 1 - np.searchsorted(thresholds, distance, side="left") / len(thresholds)
+    return np.where(np.isnan(distance), np.nan, grade)
+
+
+if __name__ == "__main__":
+    latitude, longitude = 37.749, 24.3587
+
+    # Run the check
+    grid_connectivity = check_grid_connectivity(latitude, longitude)
+
+    if grid_connectivity:
+        grid_availability = 1 # Grid is available
+    else:
+        grid_availability = 0 # Grid is not available
 
-if grid_connectivity:
-    grid_availability = 1 # Grid is available
-else:
-    grid_availability = 0 # Grid is not available
+    # Batched mode: distances for a grid of sites around the same point with one query per cluster
+    sites = [(latitude + 0.02 * i, longitude + 0.02 * j) for i in range(-5, 5) for j in range(-5, 5)]
+    grid = get_grid_distances(sites)
+    print(f"{len(sites)} sites, {len(cluster_sites(sites))} Overpass queries")
+    for (lat, lon), distance, power_type, grade in list(zip(sites, grid["distance"], grid["type"], grade_grid_distance(grid["distance"])))[:5]:
+        print(f"({lat:.3f}, {lon:.3f}): {power_type or 'nothing'} at {distance:.0f} m, grade {grade:.2f}")
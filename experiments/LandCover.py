@@ -0,0 +1,145 @@
+# Description: Batch land-cover classification of many sites on Earth Engine. Wraps the sites in a
+# FeatureCollection and samples ESA WorldCover for all of them with one sampleRegions call per chunk
+# (or one export task for very large batches), then maps the class codes to the legend with a lookup table.
+# The Earth Engine client is imported on first use, so the legend can be used without it.
+
+import csv
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Earth Engine project ID
+PROJECT_ID = 'ai-hackathon2025'  # Replace with your actual project ID
+
+# ESA WorldCover 2020, 10 m
+LAND_COVER_DATASET = 'ESA/WorldCover/v100'
+LAND_COVER_BAND = 'Map'
+
+# Sites per sampleRegions request; interactive requests are limited to 5000 features each
+CHUNK_SIZE = 5000
+
+# Land Cover Classification Legend for ESA WorldCover
+land_cover_classes = {
+    10: 'Trees',                  # Areas with tall trees (>5m), including natural forests and plantations.
+    20: 'Shrubland',              # Low woody plants (<5m), found in semi-arid regions like deserts and Mediterranean areas.
+    30: 'Grassland',              # Dominated by grasses and herbs, used for grazing or natural vegetation cover.
+    40: 'Cropland',               # Agricultural areas used for growing crops, including irrigated and rainfed fields.
+    50: 'Built-up',               # Human settlements and infrastructure, including urban areas, roads, and industrial sites.
+    60: 'Bare / Sparse vegetation', # Areas with minimal or no vegetation, like deserts, rocky terrains, and salt flats.
+    70: 'Snow and Ice',           # Perennial snow cover or glaciers, typically in polar or high-altitude regions.
+    80: 'Permanent Water Bodies', # Oceans, lakes, rivers, and reservoirs with water present throughout the year.
+    90: 'Herbaceous Wetland',     # Wetlands with herbaceous vegetation, seasonally or permanently waterlogged.
+    95: 'Mangroves',              # Coastal wetlands with salt-tolerant trees, found along tropical and subtropical shorelines.
+    100: 'Moss and Lichen'        # Areas dominated by mosses and lichens, common in tundra or boreal environments.
+}
+
+# Lookup table from class code to name; codes outside the legend (and 0, used for no data) are 'Unknown'
+CLASS_NAMES = np.full(256, 'Unknown', dtype=object)
+CLASS_NAMES[list(land_cover_classes)] = list(land_cover_classes.values())
+
+_ee = None
+
+# Function to import and initialize Earth Engine once per process, authenticating only when there are no stored credentials
+def initialize(project_id=PROJECT_ID):
+    global _ee
+    if _ee is None:
+        import ee
+        try:
+            ee.Initialize(project=project_id)
+        except ee.EEException:
+            ee.Authenticate()
+            ee.Initialize(project=project_id)
+        _ee = ee
+    return _ee
+
+# Function to map class codes to legend names (vectorized)
+def class_names(codes):
+    codes = np.asarray(codes, dtype=np.int64)
+    valid = (codes >= 0) & (codes < len(CLASS_NAMES))
+    return np.where(valid, CLASS_NAMES[np.where(valid, codes, 0)], 'Unknown')
+
+# Function to turn class areas (m² by class code) into percentages by class name
+def percentage_by_class(area_by_class):
+    total_area = sum(area_by_class.values())
+    if total_area == 0:
+        return {}
+    return {str(class_names(code)): (area / total_area) * 100 for code, area in area_by_class.items()}
+
+# Function to wrap sites in a FeatureCollection, each feature keeping its position in the batch as 'site'
+def sites_to_features(sites, offset=0):
+    ee = initialize()
+    return ee.FeatureCollection([
+        ee.Feature(ee.Geometry.Point(float(lon), float(lat)), {'site': offset + i}) for i, (lat, lon) in enumerate(sites)
+    ])
+
+# Function to sample the land-cover class of a chunk of sites with one request
+def sample_chunk(sites, offset=0, scale=10):
+    ee = initialize()
+    image = ee.ImageCollection(LAND_COVER_DATASET).first().select(LAND_COVER_BAND)
+    samples = image.sampleRegions(collection=sites_to_features(sites, offset), properties=['site'], scale=scale, geometries=False)
+    return [(f['properties']['site'], f['properties'][LAND_COVER_BAND]) for f in samples.getInfo()['features']]
+
+# Function to get the land-cover class of many sites with one sampleRegions request per chunk
+def sample_land_cover(sites, scale=10, chunk_size=CHUNK_SIZE, max_workers=4, project_id=PROJECT_ID):
+    """
+    Returns a dict of arrays: code (WorldCover class, 0 where there is no data) and type (legend name).
+    Chunks are requested concurrently; a failed chunk is printed and its sites are left as no data.
+    """
+    ee = initialize(project_id)
+    sites = list(sites)
+    codes = np.zeros(len(sites), dtype=np.int64)
+    chunks = [(sites[start:start + chunk_size], start) for start in range(0, len(sites), chunk_size)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(sample_chunk, chunk, offset, scale) for chunk, offset in chunks]
+        for future, (chunk, offset) in zip(futures, chunks):
+            try:
+                samples = future.result()
+            except ee.EEException as e:
+                print(f"Failed to sample sites {offset}-{offset + len(chunk) - 1}: {e}")
+                continue
+            if samples:
+                index, values = zip(*samples)
+                codes[list(index)] = values
+    return {"code": codes, "type": class_names(codes)}
+
+# Function to start an export task sampling the land-cover class of a very large batch of sites to Google Drive
+def export_land_cover(sites, description='land_cover_samples', folder=None, scale=10, project_id=PROJECT_ID):
+    """
+    For batches too large for interactive requests. Returns the started ee.batch.Task; once it has
+    completed, read the exported CSV with read_exported_land_cover.
+    """
+    ee = initialize(project_id)
+    image = ee.ImageCollection(LAND_COVER_DATASET).first().select(LAND_COVER_BAND)
+    samples = image.sampleRegions(collection=sites_to_features(sites), properties=['site'], scale=scale, geometries=False)
+    task = ee.batch.Export.table.toDrive(
+        collection=samples, description=description, folder=folder, fileFormat='CSV', selectors=['site', LAND_COVER_BAND]
+    )
+    task.start()
+    return task
+
+# Function to read the CSV written by export_land_cover into the same result as sample_land_cover
+def read_exported_land_cover(path, n_sites):
+    codes = np.zeros(n_sites, dtype=np.int64)
+    with open(path, newline='') as file:
+        rows = [(int(row['site']), int(float(row[LAND_COVER_BAND]))) for row in csv.DictReader(file)]
+    if rows:
+        index, values = zip(*rows)
+        codes[list(index)] = values
+    return {"code": codes, "type": class_names(codes)}
+
+# Function to get the land-cover class of a single point
+def get_land_cover(lat, lon, project_id=PROJECT_ID):
+    return int(sample_land_cover([(lat, lon)], project_id=project_id)["code"][0])
+
+
+if __name__ == "__main__":
+    import time
+
+    # Example usage: classify 10,000 sites in two sampleRegions requests
+    rng = np.random.default_rng(0)
+    sites = list(zip(rng.uniform(37.5, 38.5, 10000), rng.uniform(22.5, 24.0, 10000)))
+    start = time.perf_counter()
+    land_cover = sample_land_cover(sites)
+    print(f"Classified {len(sites):,} sites in {time.perf_counter() - start:.1f} s")
+    for (lat, lon), code, land_cover_type in list(zip(sites, land_cover["code"], land_cover["type"]))[:5]:
+        print(f"({lat:.4f}, {lon:.4f}): {code} {land_cover_type}")
@@ -0,0 +1,213 @@
+# Description: Shared client for the NASA POWER API. Gathers the parameters every analysis
+# needs for a site and time window into a single request and hands each analysis its slice.
+
+import datetime
+import os
+
+from DiskCache import CACHE_DIR, DiskCache, make_key
+from FetchEngine import fetch_all, send
+
+POWER_URL = "https://power.larc.nasa.gov/api/temporal/{temporal}/point"
+
+# NASA POWER meteorology comes from the MERRA-2 grid (0.5° latitude x 0.625° longitude)
+POWER_GRID_LAT = 0.5
+POWER_GRID_LON = 0.625
+
+# Units each POWER community reports in: RE and SB share them, AG gives irradiance in MJ/m²/day instead of kWh/m²/day
+COMMUNITY_UNITS = {"RE": "kWh", "SB": "kWh", "AG": "MJ"}
+
+# Responses for ranges that include the current year can still change, so they expire after a day
+CURRENT_YEAR_TTL = 24 * 60 * 60
+
+_power_cache = None
+
+# Gridded regions (see PowerRegion.py) that answer point requests without going to the network
+_power_regions = []
+
+# NASA POWER parameters read by each analysis script
+ANALYSIS_PARAMETERS = {
+    "temperature": ["T2M"],                     # Solar/Temperature.py
+    "cloud_amount": ["CLOUD_AMT"],              # Solar/CloudCover.py
+    "solar_irradiance": ["ALLSKY_SFC_SW_DWN"],  # Solar/MeanSolarRadianceByMonth.py
+    "wind_speed_10m": ["WS10M"],                # Wind/WindSpeed.py
+    "wind_speed_50m": ["WS50M"],                # Wind/WindSpeed.py
+    "air_density": ["PS", "T2M"],               # Wind/AirDensity.py
+    "precipitation": ["PRECTOTCORR"],           # Hydropower/Rainfall.py
+}
+
+# Function to collect the unique parameters needed by a set of analyses (all by default)
+def get_parameters(analyses=None):
+    if analyses is None:
+        analyses = ANALYSIS_PARAMETERS.keys()
+    parameters = []
+    for analysis in analyses:
+        for parameter in ANALYSIS_PARAMETERS[analysis]:
+            if parameter not in parameters:
+                parameters.append(parameter)
+    return parameters
+
+# Function to snap a coordinate to the centre of its NASA POWER grid cell
+def snap_to_power_grid(lat, lon):
+    cell_lat = round(round(lat / POWER_GRID_LAT) * POWER_GRID_LAT, 4)
+    cell_lon = round(round(lon / POWER_GRID_LON) * POWER_GRID_LON, 4)
+    return cell_lat, cell_lon
+
+# Function to check whether data fetched for one community can answer a request made for another
+def same_units(community, other):
+    return COMMUNITY_UNITS.get(community, community) == COMMUNITY_UNITS.get(other, other)
+
+# Function to get the shared on-disk cache for POWER responses
+def get_power_cache():
+    global _power_cache
+    if _power_cache is None:
+        _power_cache = DiskCache(os.environ.get("POWER_CACHE_PATH", os.path.join(CACHE_DIR, "nasa_power.sqlite")))
+    return _power_cache
+
+# Function to let point requests inside a downloaded region be read from its grid
+def register_power_region(region):
+    _power_regions.append(region)
+
+# Function to choose how long a response for the given time range may be cached (None = forever)
+def get_cache_ttl(end):
+    if int(str(end)[:4]) >= datetime.date.today().year:
+        return CURRENT_YEAR_TTL
+    return None
+
+# Function to build the URL, query parameters and cache key of a point request
+def get_power_request(lat, lon, start, end, parameters, temporal="monthly", community="RE"):
+    # The point itself is sent upstream; only the cache key is snapped to its grid cell
+    cell_lat, cell_lon = snap_to_power_grid(lat, lon)
+    params = {
+        "latitude": lat,
+        "longitude": lon,
+        "start": start,
+        "end": end,
+        "parameters": ",".join(parameters),
+        "community": community,
+        "format": "JSON"
+    }
+    key = make_key("power", temporal, community, cell_lat, cell_lon, sorted(parameters), str(start), str(end))
+    return POWER_URL.format(temporal=temporal), params, key
+
+# Function to answer a point request from a registered region or the disk cache (None if neither has it)
+def get_local_power_data(lat, lon, start, end, parameters, temporal, community, key, use_cache=True):
+    for region in _power_regions:
+        if region.covers(lat, lon, start, end, parameters, temporal, community):
+            return region.point_data(lat, lon, parameters)
+    if use_cache:
+        return get_power_cache().get_json(key)
+    return None
+
+# Function to get one or more parameters from the NASA POWER API in a single request
+def get_power_data(lat, lon, start, end, parameters, temporal="monthly", community="RE", use_cache=True):
+    """
+    Retrieves the given parameters for a point from the NASA POWER API.
+    start and end are years for monthly data and 'YYYYMMDD' dates for daily/hourly data.
+    Points inside a registered region are read from its grid. Otherwise the point is requested
+    as is and the response is cached under its POWER grid cell, so every site in the same cell
+    is served from the cache.
+    Raises requests.exceptions.RequestException on connection or HTTP errors.
+    """
+    url, params, key = get_power_request(lat, lon, start, end, parameters, temporal, community)
+    data = get_local_power_data(lat, lon, start, end, parameters, temporal, community, key, use_cache)
+    if data is not None:
+        return data
+
+    response = send("power", url, params)
+    response.raise_for_status()
+    data = response.json()
+
+    if use_cache:
+        get_power_cache().put_json(key, data, ttl=get_cache_ttl(end))
+    return data
+
+# Function to get every parameter needed by the given analyses for a site in one request
+def get_site_power_data(lat, lon, start, end, analyses=None, temporal="monthly", community="RE", use_cache=True):
+    return get_power_data(lat, lon, start, end, get_parameters(analyses), temporal, community, use_cache)
+
+# Function to group sites (a list of (lat, lon)) by POWER grid cell, keeping the first-seen cell order
+def group_sites_by_cell(sites):
+    cells = {}
+    for index, (lat, lon) in enumerate(sites):
+        cells.setdefault(snap_to_power_grid(lat, lon), []).append(index)
+    return cells
+
+# Function to get POWER data for many sites, fetching each unique grid cell only once
+def get_power_data_batch(sites, start, end, parameters, temporal="monthly", community="RE", use_cache=True, **engine_options):
+    """
+    Returns a list with one POWER response per site, in the order of sites.
+    Sites that fall in the same grid cell share the same response object.
+    Cells missing from the regions and the cache are fetched concurrently through FetchEngine,
+    requesting the first site of each cell; a cell whose request fails is reported and its sites get None.
+    """
+    cells = group_sites_by_cell(sites)
+    cell_data = {}
+    pending = []
+    for cell, indices in cells.items():
+        lat, lon = sites[indices[0]]
+        url, params, key = get_power_request(lat, lon, start, end, parameters, temporal, community)
+        data = get_local_power_data(lat, lon, start, end, parameters, temporal, community, key, use_cache)
+        if data is not None:
+            cell_data[cell] = data
+        else:
+            pending.append((cell, url, params, key))
+
+    responses = fetch_all([{"provider": "power", "url": url, "params": params} for _, url, params, _ in pending], **engine_options)
+    for (cell, _, _, key), data in zip(pending, responses):
+        if isinstance(data, Exception):
+            print(f"Request Error for grid cell {cell}: {data}")
+            data = None
+        elif use_cache:
+            get_power_cache().put_json(key, data, ttl=get_cache_ttl(end))
+        cell_data[cell] = data
+
+    results = [None] * len(sites)
+    for cell, indices in cells.items():
+        for index in indices:
+            results[index] = cell_data[cell]
+    return results
+
+# Function to get every parameter needed by the given analyses for many sites, one request per grid cell
+def get_site_power_data_batch(sites, start, end, analyses=None, temporal="monthly", community="RE", use_cache=True, **engine_options):
+    return get_power_data_batch(sites, start, end, get_parameters(analyses), temporal, community, use_cache, **engine_options)
+
+# Function to extract the slice of a POWER response used by one analysis
+def get_analysis_slice(data, analysis):
+    parameter_data = data['properties']['parameter']
+    return {parameter: parameter_data[parameter] for parameter in ANALYSIS_PARAMETERS[analysis]}
+
+# Function to split a combined POWER response into per-analysis slices
+def split_by_analysis(data, analyses=None):
+    if analyses is None:
+        analyses = ANALYSIS_PARAMETERS.keys()
+    return {analysis: get_analysis_slice(data, analysis) for analysis in analyses}
+
+
+if __name__ == "__main__":
+    from Solar.CloudCover import get_annual_mean_cloud_amount
+    from Solar.Temperature import calculate_annual_mean_temperature, get_temperature_data
+    from Wind.AirDensity import get_air_density
+    from Wind.WindSpeed import get_wind_speed_10m, get_wind_speed_50m
+
+    # Example usage: one request for every monthly analysis of Athens, Greece
+    lat, lon = 37.98, 23.73
+    start_year = 2017
+    end_year = 2018
+
+    data = get_site_power_data(lat, lon, start_year, end_year)
+
+    temperature = get_temperature_data(lat, lon, start_year, end_year, data=data)
+    print(f"Annual Mean Temperature: {calculate_annual_mean_temperature(temperature):.2f} °C")
+    print(f"Annual Mean Cloud Amount: {get_annual_mean_cloud_amount(lat, lon, start_year, end_year, data=data):.2f}%")
+    print("Monthly Mean Wind Speed at 10m:", get_wind_speed_10m(lat, lon, start_year, end_year, data=data)[0])
+    print("Monthly Mean Wind Speed at 50m:", get_wind_speed_50m(lat, lon, start_year, end_year, data=data)[0])
+    print("Monthly Air Density (kg/m³):", get_air_density(lat, lon, start_year, end_year, data=data))
+
+    # A second site in the same grid cell is served from the on-disk cache
+    get_site_power_data(lat + 0.1, lon + 0.1, start_year, end_year)
+    print("POWER cache:", get_power_cache().stats())
+
+    # Batch of sites around Athens: sites are fetched once per grid cell and fanned back out
+    sites = [(lat + 0.05 * i, lon + 0.05 * j) for i in range(-10, 11) for j in range(-10, 11)]
+    batch = get_site_power_data_batch(sites, start_year, end_year)
+    print(f"{len(sites)} sites scored from {len(group_sites_by_cell(sites))} grid cells")
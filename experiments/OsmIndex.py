@@ -0,0 +1,274 @@
+# Description: Offline index of OpenStreetMap power infrastructure. Ingests an OSM extract (PBF or XML) once
+# with pyosmium, keeps every power node, way and relation (substations, lines, towers, ...) as points on the unit
+# sphere in a KD-tree and answers nearest-infrastructure distance and type for large batches of sites,
+# without any Overpass requests.
+
+import os
+
+import numpy as np
+
+OSM_EXTRACT_PATH = os.environ.get("OSM_EXTRACT_PATH", "greece-latest.osm.pbf")
+OSM_INDEX_PATH = os.environ.get("OSM_INDEX_PATH", "power_index.npz")
+
+EARTH_RADIUS = 6371008.8  # Mean Earth radius (m)
+
+# Values of the power=* tag that are indexed (the same set GridAvailability asks Overpass for, plus related features)
+POWER_TYPES = ["substation", "line", "minor_line", "cable", "generator", "plant", "pole", "tower", "transformer"]
+
+# Ways are densified so consecutive points are at most this far apart; distances to a line are then
+# accurate to about half of it
+MAX_SEGMENT_LENGTH = 50
+
+# Sites are queried in chunks of this many, to bound memory for very large batches
+QUERY_CHUNK = 1000000
+
+# Function to convert latitude/longitude (degrees) into 3D points on the unit sphere
+def to_unit_sphere(lats, lons):
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lon = np.radians(np.asarray(lons, dtype=float))
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+# Function to convert the chord between two unit-sphere points into the great-circle distance (m)
+def chord_to_meters(chord):
+    return 2 * EARTH_RADIUS * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+
+# Function to convert a great-circle distance (m) into the chord length on the unit sphere
+def meters_to_chord(meters):
+    return 2 * np.sin(np.asarray(meters, dtype=float) / (2 * EARTH_RADIUS))
+
+# Function to add points along a polyline so no segment is longer than max_length metres
+def densify(lats, lons, max_length=MAX_SEGMENT_LENGTH):
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    if len(lats) < 2:
+        return lats, lons
+    points = to_unit_sphere(lats, lons)
+    lengths = chord_to_meters(np.linalg.norm(np.diff(points, axis=0), axis=1))
+    steps = np.maximum(np.ceil(lengths / max_length).astype(int), 1)
+    # Fractions 0, 1/n, ..., (n-1)/n along every segment, then the last vertex
+    segment = np.repeat(np.arange(len(steps)), steps)
+    fraction = np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)
+    fraction = fraction / steps[segment]
+    dense_lats = lats[segment] + (lats[segment + 1] - lats[segment]) * fraction
+    dense_lons = lons[segment] + (lons[segment + 1] - lons[segment]) * fraction
+    return np.append(dense_lats, lats[-1]), np.append(dense_lons, lons[-1])
+
+class PowerCollector:
+    """
+    Collects power features (or, with another key, e.g. 'highway', any tagged features) from an OSM file.
+    Nodes give one point, ways their densified geometry, and multipolygon relations (e.g. large substations)
+    the densified rings of their area. Other relations (power routes/circuits) are made of ways that are
+    indexed themselves. Fed by the pyosmium handler of osmium_handler.
+    """
+
+    def __init__(self, types=POWER_TYPES, max_length=MAX_SEGMENT_LENGTH, key="power"):
+        self.key = key
+        self.types = set(types)
+        self.max_length = max_length
+        self.lats, self.lons, self.features = [], [], []
+        self.feature_types, self.osm_types, self.osm_ids = [], [], []
+
+    def _add(self, osm_type, osm_id, power, lats, lons):
+        feature = len(self.feature_types)
+        self.feature_types.append(power)
+        self.osm_types.append(osm_type)
+        self.osm_ids.append(osm_id)
+        self.lats.append(np.asarray(lats, dtype=float))
+        self.lons.append(np.asarray(lons, dtype=float))
+        self.features.append(np.full(len(lats), feature, dtype=np.int64))
+
+    def node(self, n):
+        power = n.tags.get(self.key)
+        if power in self.types and n.location.valid():
+            self._add("n", n.id, power, [n.location.lat], [n.location.lon])
+
+    def way(self, w):
+        power = w.tags.get(self.key)
+        if power not in self.types:
+            return
+        nodes = [node for node in w.nodes if node.location.valid()]
+        if nodes:
+            lats, lons = densify([node.lat for node in nodes], [node.lon for node in nodes], self.max_length)
+            self._add("w", w.id, power, lats, lons)
+
+    def area(self, a):
+        # Closed ways are already handled by way(); only areas built from relations are added here
+        power = a.tags.get(self.key)
+        if a.from_way() or power not in self.types:
+            return
+        lats, lons = [], []
+        for ring in a.outer_rings():
+            ring_lats, ring_lons = densify([node.lat for node in ring], [node.lon for node in ring], self.max_length)
+            lats.extend(ring_lats)
+            lons.extend(ring_lons)
+        if lats:
+            self._add("r", a.orig_id(), power, lats, lons)
+
+# Function to wrap a PowerCollector in a pyosmium handler; pyosmium is imported only when an extract is read,
+# so the index (and GridAvailability's Overpass mode) works without it
+def osmium_handler(collector):
+    import osmium
+
+    class PowerHandler(osmium.SimpleHandler):
+        def node(self, n):
+            collector.node(n)
+
+        def way(self, w):
+            collector.way(w)
+
+        def area(self, a):
+            collector.area(a)
+
+    return PowerHandler()
+
+class OsmIndex:
+    """
+    KD-tree over unit-sphere points of OSM power features. lats/lons are the indexed points and
+    features[i] is the feature each point belongs to; feature_types, osm_types ('n', 'w', 'r') and
+    osm_ids describe the features.
+    """
+
+    def __init__(self, lats, lons, features, feature_types, osm_types, osm_ids):
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        self.features = np.asarray(features, dtype=np.int64)
+        self.feature_types = np.asarray(feature_types, dtype=str)
+        self.osm_types = np.asarray(osm_types, dtype=str)
+        self.osm_ids = np.asarray(osm_ids, dtype=np.int64)
+        self._trees = {}
+
+    @classmethod
+    def from_osm(cls, path=OSM_EXTRACT_PATH, types=POWER_TYPES, max_length=MAX_SEGMENT_LENGTH, key="power"):
+        # Reads the extract once (node locations are kept so ways and areas get their geometry)
+        handler = PowerCollector(types, max_length, key)
+        osmium_handler(handler).apply_file(path, locations=True)
+        concat = lambda arrays, dtype: np.concatenate(arrays) if arrays else np.empty(0, dtype=dtype)
+        return cls(
+            concat(handler.lats, float), concat(handler.lons, float), concat(handler.features, np.int64),
+            handler.feature_types, handler.osm_types, handler.osm_ids
+        )
+
+    def save(self, path=OSM_INDEX_PATH):
+        np.savez_compressed(
+            path, lats=self.lats, lons=self.lons, features=self.features,
+            feature_types=self.feature_types, osm_types=self.osm_types, osm_ids=self.osm_ids
+        )
+
+    @classmethod
+    def load(cls, path=OSM_INDEX_PATH):
+        with np.load(path) as f:
+            return cls(f['lats'], f['lons'], f['features'], f['feature_types'], f['osm_types'], f['osm_ids'])
+
+    def _tree(self, types):
+        # One tree per requested set of types, built on first use
+        key = None if types is None else tuple(sorted(types))
+        if key not in self._trees:
+            # scipy is imported on first query, keeping the module cheap to import
+            from scipy.spatial import cKDTree
+            points = np.arange(len(self.lats)) if key is None else np.flatnonzero(np.isin(self.feature_types[self.features], key))
+            tree = cKDTree(to_unit_sphere(self.lats[points], self.lons[points])) if len(points) else None
+            self._trees[key] = (tree, points)
+        return self._trees[key]
+
+    def nearest(self, lats, lons, types=None, max_distance=None, workers=-1):
+        """
+        Nearest indexed feature for every site, optionally restricted to some power types.
+        Returns a dict of arrays: distance (m), type, osm_type and osm_id; sites with nothing within
+        max_distance (m) get distance inf and empty type/osm_type and osm_id -1.
+        """
+        lats = np.asarray(lats, dtype=float).ravel()
+        lons = np.asarray(lons, dtype=float).ravel()
+        tree, points = self._tree(types)
+        distance = np.full(len(lats), np.inf)
+        feature = np.full(len(lats), -1, dtype=np.int64)
+        if tree is not None:
+            upper = np.inf if max_distance is None else meters_to_chord(max_distance)
+            for start in range(0, len(lats), QUERY_CHUNK):
+                block = slice(start, start + QUERY_CHUNK)
+                chord, index = tree.query(to_unit_sphere(lats[block], lons[block]), distance_upper_bound=upper, workers=workers)
+                # Misses come back with chord inf and index len(points)
+                found = np.isfinite(chord)
+                distance[block] = np.where(found, chord_to_meters(np.where(found, chord, 0)), np.inf)
+                feature[block] = np.where(found, self.features[points[np.minimum(index, len(points) - 1)]], -1)
+
+        found = feature >= 0
+        describe = lambda values, missing: np.where(found, values[feature], missing) if len(values) else np.full(len(lats), missing)
+        return {
+            "distance": distance,
+            "type": describe(self.feature_types, ""),
+            "osm_type": describe(self.osm_types, ""),
+            "osm_id": describe(self.osm_ids, -1),
+        }
+
+    def within(self, lats, lons, radius, types=None):
+        # True for sites with indexed infrastructure within radius metres (the offline check_grid_connectivity)
+        return np.isfinite(self.nearest(lats, lons, types, max_distance=radius)["distance"])
+
+# Function to get the power index, building it from the extract on the first run and loading it afterwards
+def get_power_index(index_path=OSM_INDEX_PATH, extract_path=OSM_EXTRACT_PATH):
+    if os.path.exists(index_path):
+        return OsmIndex.load(index_path)
+    index = OsmIndex.from_osm(extract_path)
+    index.save(index_path)
+    return index
+
+# Function to write a small OSM XML extract (a substation, a line on towers, a generator and two roads near Athens) for trying the index
+def write_sample_extract(path):
+    nodes = [
+        (1, 37.9900, 23.7000, {"power": "tower"}),
+        (2, 38.0000, 23.7200, {"power": "tower"}),
+        (3, 38.0100, 23.7400, {"power": "tower"}),
+        (4, 37.9500, 23.6500, {}),
+        (5, 37.9500, 23.6540, {}),
+        (6, 37.9470, 23.6540, {}),
+        (7, 37.9470, 23.6500, {}),
+        (8, 38.0500, 23.8000, {"power": "generator", "generator:source": "solar"}),
+        (20, 37.9000, 23.6000, {}),
+        (21, 37.9800, 23.7500, {}),
+        (22, 38.1000, 23.9000, {}),
+        (23, 38.0500, 23.5500, {}),
+        (24, 38.0800, 23.6500, {}),
+    ]
+    ways = [
+        (10, [1, 2, 3], {"power": "line", "voltage": "150000"}),
+        (11, [4, 5, 6, 7, 4], {"power": "substation"}),
+        (12, [20, 21, 22], {"highway": "primary"}),
+        (13, [23, 24], {"highway": "track"}),
+    ]
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<osm version="0.6" generator="greenloop">']
+    for node_id, lat, lon, tags in nodes:
+        lines.append(f'  <node id="{node_id}" version="1" lat="{lat}" lon="{lon}">')
+        lines.extend(f'    <tag k="{key}" v="{value}"/>' for key, value in tags.items())
+        lines.append('  </node>')
+    for way_id, refs, tags in ways:
+        lines.append(f'  <way id="{way_id}" version="1">')
+        lines.extend(f'    <nd ref="{ref}"/>' for ref in refs)
+        lines.extend(f'    <tag k="{key}" v="{value}"/>' for key, value in tags.items())
+        lines.append('  </way>')
+    lines.append('</osm>')
+    with open(path, "w") as file:
+        file.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    # Example usage: index the sample extract, then query a million random sites around Athens
+    with tempfile.TemporaryDirectory() as directory:
+        extract = os.path.join(directory, "sample.osm")
+        write_sample_extract(extract)
+        index = OsmIndex.from_osm(extract)
+    print(f"Indexed {len(index.feature_types)} features as {len(index.lats)} points")
+
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(37.8, 38.2, 1000000)
+    lons = rng.uniform(23.5, 24.0, 1000000)
+    start = time.perf_counter()
+    nearest = index.nearest(lats, lons)
+    print(f"Nearest infrastructure for {len(lats):,} sites in {time.perf_counter() - start:.2f} s")
+    for i in range(3):
+        print(f"({lats[i]:.4f}, {lons[i]:.4f}): {nearest['type'][i]} {nearest['osm_type'][i]}{nearest['osm_id'][i]} at {nearest['distance'][i]:.0f} m")
+    substations = index.nearest(lats[:3], lons[:3], types=["substation"])
+    print("Distance to the nearest substation (m):", np.round(substations["distance"]).tolist())
+    print("Grid within 1 km:", index.within(lats[:3], lons[:3], 1000).tolist())
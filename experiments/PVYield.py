@@ -0,0 +1,211 @@
+# Description: PV yield simulation. Estimates the specific yield (kWh/kWp) of fixed PV arrays from monthly or
+# hourly NASA POWER irradiance (ALLSKY_SFC_SW_DWN) and air temperature (T2M): splits global irradiance into beam
+# and diffuse parts (Erbs), transposes it to the plane of the array (isotropic sky) using the tilt and aspect
+# from the terrain code, and derates for cell temperature. Vectorized across sites x timesteps.
+
+import calendar
+
+import numpy as np
+
+from NasaPower import get_power_data_batch
+from PowerSeries import responses_to_array
+
+PV_PARAMETERS = ["ALLSKY_SFC_SW_DWN", "T2M"]
+
+SOLAR_CONSTANT = 1367  # W/m²
+
+# Day of the year whose declination is closest to each month's mean (Klein, 1977)
+REPRESENTATIVE_DAYS = np.array([17, 47, 75, 105, 135, 162, 198, 228, 258, 288, 318, 344])
+
+# Default module and system parameters (crystalline silicon, open rack)
+TEMPERATURE_COEFFICIENT = -0.004  # Relative power change per °C above 25 °C
+NOCT = 45  # Nominal operating cell temperature (°C at 800 W/m², 20 °C air)
+SYSTEM_LOSSES = 0.14  # Inverter, wiring, soiling and mismatch losses
+ALBEDO = 0.2
+
+# Below this sun elevation (cos(zenith) ≈ 0.065, zenith ≈ 86°) beam irradiance is treated as diffuse
+MIN_COS_ZENITH = 0.065
+
+# Function to convert terrain slope (%) and aspect (degrees, direction the slope faces) into array tilt and azimuth
+def terrain_orientation(slope, aspect, lats=None):
+    """
+    Panels laid on the terrain: tilt = atan(slope / 100) in degrees; the azimuth (degrees clockwise
+    from north) is the aspect. Flat or missing aspect faces the equator (south, or north for lats < 0).
+    """
+    tilt = np.degrees(np.arctan(np.nan_to_num(np.asarray(slope, dtype=float)) / 100))
+    equator = 180.0 if lats is None else np.where(np.asarray(lats, dtype=float) < 0, 0.0, 180.0)
+    azimuth = np.where(np.isnan(np.asarray(aspect, dtype=float)), equator, aspect)
+    return tilt, azimuth
+
+# Function to get the declination (radians) and extraterrestrial normal irradiance (W/m²) for days of the year
+def solar_day(day_of_year):
+    angle = 2 * np.pi * np.asarray(day_of_year, dtype=float) / 365
+    declination = np.radians(23.45) * np.sin(2 * np.pi * (284 + np.asarray(day_of_year, dtype=float)) / 365)
+    return declination, SOLAR_CONSTANT * (1 + 0.033 * np.cos(angle))
+
+# Function to compute the cosine of the zenith angle and the solar azimuth (radians clockwise from north)
+def solar_position(lat, declination, hour_angle):
+    phi = np.radians(lat)
+    cos_zenith = np.sin(phi) * np.sin(declination) + np.cos(phi) * np.cos(declination) * np.cos(hour_angle)
+    azimuth = np.arctan2(np.sin(hour_angle), np.cos(hour_angle) * np.sin(phi) - np.tan(declination) * np.cos(phi)) + np.pi
+    return cos_zenith, azimuth
+
+# Function to compute the diffuse fraction of hourly global irradiance from the clearness index (Erbs et al., 1982)
+def erbs_diffuse_fraction(kt):
+    kt = np.clip(kt, 0, 1)
+    middle = 0.9511 - 0.1604 * kt + 4.388 * kt ** 2 - 16.638 * kt ** 3 + 12.336 * kt ** 4
+    return np.where(kt <= 0.22, 1 - 0.09 * kt, np.where(kt <= 0.8, middle, 0.165))
+
+# Function to transpose hourly global irradiance to the plane of the array (isotropic sky model)
+def plane_of_array(ghi, cos_zenith, solar_azimuth, extraterrestrial, tilt, azimuth, albedo=ALBEDO):
+    """
+    All arguments broadcast against each other (e.g. sites x timesteps); angles of the array in degrees.
+    ghi is the mean global horizontal irradiance of each hour (W/m², equal to Wh/m² per hour).
+    Returns the plane-of-array irradiance in the same units.
+    """
+    beta = np.radians(tilt)
+    gamma = np.radians(azimuth)
+    sun_up = cos_zenith > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kt = np.where(sun_up, ghi / (extraterrestrial * np.maximum(cos_zenith, MIN_COS_ZENITH)), 0)
+    diffuse = ghi * np.where(cos_zenith > MIN_COS_ZENITH, erbs_diffuse_fraction(kt), 1)
+    beam = ghi - diffuse
+
+    sin_zenith = np.sqrt(np.clip(1 - cos_zenith ** 2, 0, 1))
+    cos_incidence = np.cos(beta) * cos_zenith + np.sin(beta) * sin_zenith * np.cos(solar_azimuth - gamma)
+    ratio = np.where(sun_up, np.maximum(cos_incidence, 0) / np.maximum(cos_zenith, MIN_COS_ZENITH), 0)
+
+    return beam * ratio + diffuse * (1 + np.cos(beta)) / 2 + ghi * albedo * (1 - np.cos(beta)) / 2
+
+# Function to compute the temperature derating factor of PV modules
+def temperature_derate(poa, air_temperature, temperature_coefficient=TEMPERATURE_COEFFICIENT, noct=NOCT):
+    # Cell temperature from the NOCT model: T_cell = T_air + POA / 800 * (NOCT - 20)
+    cell_temperature = air_temperature + poa / 800 * (noct - 20)
+    return 1 + temperature_coefficient * (cell_temperature - 25)
+
+# Function to simulate PV yield from hourly irradiance and temperature
+def simulate_hourly(lats, ghi, t2m, keys, tilt, azimuth, albedo=ALBEDO, system_losses=SYSTEM_LOSSES):
+    """
+    ghi (Wh/m² per hour) and t2m (°C) have shape (sites, hours), keys are the 'YYYYMMDDHH' timestamps
+    in local solar time (the POWER default), tilt and azimuth are per site (degrees).
+    Returns a dict with poa (kWh/m²) and yield (kWh/kWp) per site and hour, and the annual yield per site.
+    """
+    keys = np.asarray(keys).astype(np.int64)
+    year, month, day = keys // 1000000, keys // 10000 % 100, keys // 100 % 100
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    day_of_year = np.cumsum([0, 0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30])[month] + day + (leap & (month > 2))
+    # Hourly values cover [h, h + 1), so use the sun position at the middle of the hour
+    hour_angle = np.radians(15 * (keys % 100 + 0.5 - 12))
+    declination, extraterrestrial = solar_day(day_of_year)
+
+    lats = np.asarray(lats, dtype=float)[:, None]
+    cos_zenith, solar_azimuth = solar_position(lats, declination[None, :], hour_angle[None, :])
+    poa = plane_of_array(
+        np.nan_to_num(ghi), cos_zenith, solar_azimuth, extraterrestrial[None, :],
+        np.asarray(tilt, dtype=float)[:, None], np.asarray(azimuth, dtype=float)[:, None], albedo
+    )
+    energy = poa / 1000 * temperature_derate(poa, t2m) * (1 - system_losses)
+    energy = np.where(np.isnan(ghi) | np.isnan(t2m), np.nan, energy)
+
+    # Mean hourly yield scaled to a year, so ranges shorter than a year still give an annual figure
+    with np.errstate(invalid="ignore"):
+        annual = np.nansum(energy, axis=1) / np.sum(~np.isnan(energy), axis=1) * 8760
+    return {"poa": poa / 1000, "yield": energy, "annual_yield": annual}
+
+# Function to build the hourly profile of a representative day from monthly mean daily irradiance
+def representative_day(lats, months, daily_ghi):
+    """
+    Splits monthly mean daily global irradiance (kWh/m²/day, shape (sites, months)) into 24 hourly values
+    with the Collares-Pereira and Rabl profile, for the representative day of each month.
+    Returns ghi (W/m², shape (sites, months, 24)), the sun position and extraterrestrial irradiance.
+    """
+    declination, extraterrestrial = solar_day(REPRESENTATIVE_DAYS[np.asarray(months) - 1])
+    phi = np.radians(np.asarray(lats, dtype=float))[:, None, None]
+    declination = declination[None, :, None]
+    sunset = np.arccos(np.clip(-np.tan(phi) * np.tan(declination), -1, 1))
+    hour_angle = np.radians(15 * (np.arange(24) + 0.5 - 12))[None, None, :]
+
+    a = 0.409 + 0.5016 * np.sin(sunset - np.pi / 3)
+    b = 0.6609 - 0.4767 * np.sin(sunset - np.pi / 3)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        profile = (a + b * np.cos(hour_angle)) * np.maximum(np.cos(hour_angle) - np.cos(sunset), 0) / (np.sin(sunset) - sunset * np.cos(sunset))
+        # Normalise so the hours add up to exactly the daily total (no sun during polar night)
+        profile = np.nan_to_num(profile / profile.sum(axis=2, keepdims=True))
+    ghi = np.asarray(daily_ghi, dtype=float)[:, :, None] * 1000 * profile
+
+    cos_zenith, solar_azimuth = solar_position(np.degrees(phi), declination, hour_angle)
+    return ghi, cos_zenith, solar_azimuth, extraterrestrial[None, :, None]
+
+# Function to simulate PV yield from monthly mean daily irradiance and monthly mean temperature
+def simulate_monthly(lats, ghi, t2m, keys, tilt, azimuth, albedo=ALBEDO, system_losses=SYSTEM_LOSSES):
+    """
+    ghi (kWh/m²/day, the POWER monthly unit) and t2m (°C) have shape (sites, months), keys are the
+    'YYYYMM' months. Each month is simulated as its representative day (hourly profile from the daily total)
+    at the month's mean temperature. Returns a dict with poa (kWh/m²) and yield (kWh/kWp) per site and month,
+    and the mean annual yield per site.
+    """
+    months = np.array([int(key[-2:]) for key in keys])
+    days_in_month = np.array([calendar.monthrange(int(key[:4]), int(key[-2:]))[1] for key in keys])
+    hourly_ghi, cos_zenith, solar_azimuth, extraterrestrial = representative_day(lats, months, np.nan_to_num(ghi))
+    poa = plane_of_array(
+        hourly_ghi, cos_zenith, solar_azimuth, extraterrestrial,
+        np.asarray(tilt, dtype=float)[:, None, None], np.asarray(azimuth, dtype=float)[:, None, None], albedo
+    )
+    derate = temperature_derate(poa, np.asarray(t2m, dtype=float)[:, :, None])
+    daily_poa = poa.sum(axis=2) / 1000
+    daily_yield = (poa * derate).sum(axis=2) / 1000 * (1 - system_losses)
+
+    energy = np.where(np.isnan(ghi) | np.isnan(t2m), np.nan, daily_yield * days_in_month)
+    years = len({key[:4] for key in keys}) or 1
+    return {
+        "poa": np.where(np.isnan(ghi), np.nan, daily_poa * days_in_month),
+        "yield": energy,
+        "annual_yield": np.nansum(energy, axis=1) / years,
+    }
+
+# Function to estimate the PV yield of many sites from NASA POWER data, one request per grid cell
+def get_pv_yield(sites, start, end, temporal="monthly", terrain=None, tilt=None, azimuth=None,
+                 albedo=ALBEDO, system_losses=SYSTEM_LOSSES, use_cache=True, **engine_options):
+    """
+    sites is a list of (lat, lon); start and end are years for monthly data or 'YYYYMMDD' for hourly data.
+    The array orientation comes from tilt/azimuth (degrees, per site or scalar), else from terrain (the list
+    returned by Elevation.get_terrain or DemRaster.get_terrain, panels laid on the slope), else the panels
+    face the equator at a tilt equal to the latitude. Returns the dict of simulate_monthly / simulate_hourly.
+    """
+    lats = np.array([lat for lat, _ in sites], dtype=float)
+    if tilt is None and terrain is not None:
+        slope = [np.nan if t["slope"] is None else t["slope"] for t in terrain]
+        aspect = [np.nan if t["aspect"] is None else t["aspect"] for t in terrain]
+        tilt, azimuth = terrain_orientation(slope, aspect, lats)
+    if tilt is None:
+        tilt = np.abs(lats)
+    if azimuth is None:
+        azimuth = np.where(lats < 0, 0.0, 180.0)
+    tilt = np.broadcast_to(np.asarray(tilt, dtype=float), lats.shape)
+    azimuth = np.broadcast_to(np.asarray(azimuth, dtype=float), lats.shape)
+
+    responses = get_power_data_batch(sites, start, end, PV_PARAMETERS, temporal, "SB", use_cache, **engine_options)
+    keys, values = responses_to_array(responses, PV_PARAMETERS, temporal)
+    simulate = simulate_monthly if temporal == "monthly" else simulate_hourly
+    result = simulate(lats, values[:, :, 0], values[:, :, 1], keys, tilt, azimuth, albedo, system_losses)
+    result["keys"] = keys
+    result["tilt"] = tilt
+    result["azimuth"] = azimuth
+    return result
+
+
+if __name__ == "__main__":
+    from DemRaster import synthetic_dem
+
+    # Example usage: yield of panels laid on the terrain of a synthetic DEM, compared with optimally tilted panels
+    dem = synthetic_dem()
+    sites = [(39.5 - 0.05 * i, 21.05 + 0.05 * j) for i in range(1, 6) for j in range(6)]
+    terrain = dem.get_terrain(sites, distance_m=100)
+
+    on_terrain = get_pv_yield(sites, 2020, 2022, terrain=terrain)
+    tilted = get_pv_yield(sites, 2020, 2022)
+    for (lat, lon), site_terrain, terrain_yield, tilted_yield in list(zip(sites, terrain, on_terrain["annual_yield"], tilted["annual_yield"]))[:5]:
+        print(
+            f"({lat:.2f}, {lon:.2f}) slope {site_terrain['slope']:.1f}% aspect {site_terrain['aspect']:.0f}°: "
+            f"{terrain_yield:.0f} kWh/kWp on the terrain, {tilted_yield:.0f} kWh/kWp tilted at {lat:.0f}° south"
+        )
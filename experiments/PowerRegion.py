@@ -0,0 +1,244 @@
+# Description: Region mode for the NASA POWER API. Pulls every parameter for a bounding box through
+# tiled requests to the regional endpoint and stores it as a gridded NumPy array
+# (lat x lon x month x param) that the point-based functions can read from instead of the network.
+
+import math
+
+import numpy as np
+
+from DiskCache import make_key
+from FetchEngine import fetch_all, send
+from NasaPower import get_cache_ttl, get_parameters, get_power_cache, register_power_region, same_units
+
+POWER_REGIONAL_URL = "https://power.larc.nasa.gov/api/temporal/{temporal}/regional"
+
+# The regional endpoint accepts boxes between 2 and 10 degrees on each side and one parameter per request
+MIN_TILE_DEGREES = 2
+MAX_TILE_DEGREES = 10
+
+# Parameters pulled for a region: everything the monthly analyses read
+REGION_PARAMETERS = get_parameters()
+
+# Value NASA POWER uses for missing data
+FILL_VALUE = -999.0
+
+# Function to split a bounding box (lat_min, lon_min, lat_max, lon_max) into tiles the regional endpoint accepts
+def split_bbox(bbox):
+    lat_min, lon_min, lat_max, lon_max = bbox
+    tiles = []
+    lat_edges = _tile_edges(lat_min, lat_max)
+    lon_edges = _tile_edges(lon_min, lon_max)
+    for lat_start, lat_end in zip(lat_edges[:-1], lat_edges[1:]):
+        for lon_start, lon_end in zip(lon_edges[:-1], lon_edges[1:]):
+            tiles.append((lat_start, lon_start, lat_end, lon_end))
+    return tiles
+
+def _tile_edges(start, end):
+    span = end - start
+    if span < MIN_TILE_DEGREES:
+        # Grow small boxes around their centre; the extra cells are simply kept in the grid
+        centre = (start + end) / 2
+        return [centre - MIN_TILE_DEGREES / 2, centre + MIN_TILE_DEGREES / 2]
+    count = math.ceil(span / MAX_TILE_DEGREES)
+    # Equal tiles no wider than MAX_TILE_DEGREES; with span >= MIN_TILE_DEGREES none is too narrow
+    return list(np.linspace(start, end, count + 1))
+
+# Function to build the URL, query parameters and cache key of a regional request
+def get_regional_request(tile, start, end, parameter, temporal="monthly", community="RE"):
+    lat_min, lon_min, lat_max, lon_max = [round(float(edge), 4) for edge in tile]
+    params = {
+        "latitude-min": lat_min,
+        "latitude-max": lat_max,
+        "longitude-min": lon_min,
+        "longitude-max": lon_max,
+        "start": start,
+        "end": end,
+        "parameters": parameter,
+        "community": community,
+        "format": "JSON"
+    }
+    key = make_key("power-regional", temporal, community, lat_min, lon_min, lat_max, lon_max, parameter, str(start), str(end))
+    return POWER_REGIONAL_URL.format(temporal=temporal), params, key
+
+# Function to get one parameter for one tile from the regional endpoint
+def get_regional_data(tile, start, end, parameter, temporal="monthly", community="RE", use_cache=True):
+    """
+    Retrieves a single parameter for a tile (lat_min, lon_min, lat_max, lon_max) as GeoJSON.
+    Raises requests.exceptions.RequestException on connection or HTTP errors.
+    """
+    url, params, key = get_regional_request(tile, start, end, parameter, temporal, community)
+    if use_cache:
+        data = get_power_cache().get_json(key)
+        if data is not None:
+            return data
+
+    response = send("power", url, params)
+    response.raise_for_status()
+    data = response.json()
+
+    if use_cache:
+        get_power_cache().put_json(key, data, ttl=get_cache_ttl(end))
+    return data
+
+class PowerGrid:
+    """
+    Gridded NASA POWER data for a region, for one time window, temporal resolution and community.
+    values has shape (len(lats), len(lons), len(keys), len(parameters)); keys are the POWER
+    time keys (e.g. 'YYYYMM', including the annual 'YYYY13' entries) and missing values are NaN.
+    """
+
+    def __init__(self, bbox, start, end, temporal, lats, lons, keys, parameters, values, community="RE"):
+        self.bbox = tuple(bbox)
+        self.start = start
+        self.end = end
+        self.temporal = temporal
+        self.community = community
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        self.keys = list(keys)
+        self.parameters = list(parameters)
+        self.values = np.asarray(values, dtype=float)
+        # Parameters can come on different grids (e.g. 1° solar vs 0.5° x 0.625° meteorology),
+        # so remember which cells actually hold data for each parameter
+        self._valid = ~np.isnan(self.values).all(axis=2)
+
+    @classmethod
+    def from_features(cls, bbox, start, end, temporal, features_by_parameter, community="RE"):
+        # Collect the grid coordinates and time keys from every response
+        lats, lons, keys = set(), set(), {}
+        for features in features_by_parameter.values():
+            for feature in features:
+                lon, lat = feature['geometry']['coordinates'][:2]
+                lats.add(round(lat, 4))
+                lons.add(round(lon, 4))
+                for parameter_values in feature['properties']['parameter'].values():
+                    keys.update(dict.fromkeys(parameter_values))
+        lats, lons, keys = sorted(lats), sorted(lons), sorted(keys)
+        lat_index = {lat: i for i, lat in enumerate(lats)}
+        lon_index = {lon: i for i, lon in enumerate(lons)}
+        key_index = {key: i for i, key in enumerate(keys)}
+
+        parameters = list(features_by_parameter)
+        values = np.full((len(lats), len(lons), len(keys), len(parameters)), np.nan)
+        for p, parameter in enumerate(parameters):
+            for feature in features_by_parameter[parameter]:
+                lon, lat = feature['geometry']['coordinates'][:2]
+                series = feature['properties']['parameter'][parameter]
+                column = np.array([key_index[key] for key in series], dtype=int)
+                values[lat_index[round(lat, 4)], lon_index[round(lon, 4)], column, p] = list(series.values())
+        values[values == FILL_VALUE] = np.nan
+        return cls(bbox, start, end, temporal, lats, lons, keys, parameters, values, community)
+
+    def contains(self, lat, lon):
+        lat_min, lon_min, lat_max, lon_max = self.bbox
+        return lat_min <= lat <= lat_max and lon_min <= lon <= lon_max
+
+    def covers(self, lat, lon, start, end, parameters, temporal="monthly", community="RE"):
+        # True when a point request can be answered from this grid without going to the network; the point
+        # fetchers ask for SB, which an RE grid answers since both communities use the same units
+        return (
+            temporal == self.temporal and same_units(community, self.community)
+            and str(start) == str(self.start) and str(end) == str(self.end)
+            and set(parameters) <= set(self.parameters) and self.contains(lat, lon)
+        )
+
+    def nearest_cell(self, lat, lon, parameter):
+        # Index (i, j) of the closest grid cell that holds data for the parameter
+        valid_i, valid_j = np.nonzero(self._valid[:, :, self.parameters.index(parameter)])
+        if len(valid_i) == 0:
+            raise KeyError(f"No data for {parameter} in this region")
+        distance = (self.lats[valid_i] - lat) ** 2 + (self.lons[valid_j] - lon) ** 2
+        nearest = np.argmin(distance)
+        return valid_i[nearest], valid_j[nearest]
+
+    def point_series(self, lat, lon, parameter):
+        i, j = self.nearest_cell(lat, lon, parameter)
+        return self.values[i, j, :, self.parameters.index(parameter)]
+
+    def point_data(self, lat, lon, parameters=None):
+        # POWER point-style response for the nearest cell, so it can be passed as data= to the fetchers
+        if parameters is None:
+            parameters = self.parameters
+        parameter_data = {}
+        for parameter in parameters:
+            series = self.point_series(lat, lon, parameter)
+            series = np.where(np.isnan(series), FILL_VALUE, series)
+            parameter_data[parameter] = dict(zip(self.keys, series.tolist()))
+        return {"properties": {"parameter": parameter_data}}
+
+    def save(self, path):
+        np.savez_compressed(
+            path, bbox=self.bbox, start=str(self.start), end=str(self.end), temporal=self.temporal,
+            community=self.community, lats=self.lats, lons=self.lons, keys=self.keys, parameters=self.parameters, values=self.values
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            # Grids saved before the community was stored were all fetched with the default "RE"
+            community = str(f['community']) if 'community' in f.files else "RE"
+            return cls(
+                f['bbox'], str(f['start']), str(f['end']), str(f['temporal']), f['lats'], f['lons'],
+                f['keys'].tolist(), f['parameters'].tolist(), f['values'], community
+            )
+
+# Function to pull a whole bounding box into a PowerGrid
+def get_power_region(bbox, start, end, parameters=None, temporal="monthly", community="RE", use_cache=True, register=True, **engine_options):
+    """
+    bbox is (lat_min, lon_min, lat_max, lon_max). The box is split into tiles the regional endpoint
+    accepts and one request is sent per tile and parameter, concurrently through FetchEngine.
+    Raises the first request error (after caching the tiles that succeeded), since a grid with
+    missing tiles would silently lose cells.
+    When register is True, point requests inside the box are answered from the grid by NasaPower.
+    """
+    if parameters is None:
+        parameters = REGION_PARAMETERS
+    features_by_parameter = {parameter: [] for parameter in parameters}
+    pending = []
+    for tile in split_bbox(bbox):
+        for parameter in parameters:
+            url, params, key = get_regional_request(tile, start, end, parameter, temporal, community)
+            data = get_power_cache().get_json(key) if use_cache else None
+            if data is not None:
+                features_by_parameter[parameter].extend(data['features'])
+            else:
+                pending.append((parameter, url, params, key))
+
+    # Tiles missing from the cache are fetched concurrently
+    responses = fetch_all([{"provider": "power", "url": url, "params": params} for _, url, params, _ in pending], **engine_options)
+    errors = []
+    for (parameter, _, _, key), data in zip(pending, responses):
+        if isinstance(data, Exception):
+            errors.append(data)
+            continue
+        if use_cache:
+            get_power_cache().put_json(key, data, ttl=get_cache_ttl(end))
+        features_by_parameter[parameter].extend(data['features'])
+    if errors:
+        raise errors[0]
+
+    grid = PowerGrid.from_features(bbox, start, end, temporal, features_by_parameter, community)
+    if register:
+        register_power_region(grid)
+    return grid
+
+
+if __name__ == "__main__":
+    from Solar.Temperature import calculate_annual_mean_temperature, get_temperature_data
+    from Wind.WindSpeed import get_wind_speed_10m
+
+    # Example usage: sweep Attica, then read single sites from the grid
+    bbox = (37.5, 23.0, 38.5, 24.5)
+    start_year = 2017
+    end_year = 2017
+
+    grid = get_power_region(bbox, start_year, end_year)
+    print(f"Region grid: {grid.values.shape} (lat x lon x month x param)")
+
+    lat, lon = 37.98, 23.73
+    temperature = get_temperature_data(lat, lon, start_year, end_year, data=grid.point_data(lat, lon))
+    print(f"Annual Mean Temperature: {calculate_annual_mean_temperature(temperature):.2f} °C")
+    # Registered grids also answer ordinary point requests without a network call (the fetchers ask for SB,
+    # which this RE grid answers)
+    print("Answered from the grid:", grid.covers(lat, lon, start_year, end_year, ["WS10M"], community="SB"))
+    print("Monthly Mean Wind Speed at 10m:", get_wind_speed_10m(lat, lon, start_year, end_year)[0])
@@ -0,0 +1,144 @@
+# Description: Shared aggregation kernel for NASA POWER time series. Converts POWER responses (or single
+# parameter dicts) into typed arrays once, keeping the annual 'YYYY13' values apart from the monthly ones,
+# and computes monthly, seasonal (hemisphere-aware) and annual reductions as vectorized group-bys across sites.
+
+import numpy as np
+
+# Value NASA POWER uses for missing data
+FILL_VALUE = -999.0
+
+SEASONS = ["Winter", "Spring", "Summer", "Fall"]
+
+# Season index (into SEASONS) of each calendar month, for each hemisphere
+NORTHERN_SEASON_OF_MONTH = np.array([0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0])  # DJF, MAM, JJA, SON
+SOUTHERN_SEASON_OF_MONTH = np.array([2, 2, 3, 3, 3, 0, 0, 0, 1, 1, 1, 2])  # JJA, SON, DJF, MAM
+
+# Function to average an array along an axis ignoring NaN (NaN where every value is missing, without warnings)
+def nan_mean(values, axis=-1):
+    counts = np.sum(~np.isnan(values), axis=axis)
+    return np.where(counts > 0, np.nansum(values, axis=axis) / np.maximum(counts, 1), np.nan)
+
+# Function to reduce the timestep axis (1) of a (sites, timesteps, parameters) array by group
+def group_reduce(values, groups, n_groups, reduce="mean"):
+    """
+    groups holds the group index of every timestep (or of every site and timestep, shape (sites, timesteps)).
+    Sums and counts are computed with one matrix product against the one-hot group matrix, ignoring NaN.
+    Returns (sites, n_groups, parameters); groups without any value are NaN.
+    """
+    one_hot = (np.asarray(groups)[..., None] == np.arange(n_groups)).astype(float)
+    missing = np.isnan(values)
+    subscripts = "stp,tg->sgp" if one_hot.ndim == 2 else "stp,stg->sgp"
+    totals = np.einsum(subscripts, np.where(missing, 0, values), one_hot)
+    counts = np.einsum(subscripts, (~missing).astype(float), one_hot)
+    if reduce == "sum":
+        return np.where(counts > 0, totals, np.nan)
+    if reduce == "mean":
+        return np.where(counts > 0, totals / np.maximum(counts, 1), np.nan)
+    raise ValueError(f"Unknown reduction {reduce}")
+
+# Function to convert POWER responses of many sites into one array
+def responses_to_array(responses, parameters, temporal="monthly"):
+    """
+    Returns (keys, values) where keys are the timestamps present in the responses ('YYYYMM' for monthly
+    data, where the annual 'YYYY13' entries are left out, or 'YYYYMMDDHH' for hourly data) and values has
+    shape (sites, timesteps, parameters). Missing sites (None responses), timestamps and fill values are NaN.
+    """
+    series = PowerSeries.from_responses(responses, parameters, temporal)
+    return series.keys, series.values
+
+class PowerSeries:
+    """
+    POWER time series of many sites as arrays. values has shape (sites, timesteps, parameters) for the
+    monthly (or hourly) timesteps in keys, with the calendar year and month of each timestep in years and
+    months. For monthly data, the annual values POWER reports under 'YYYY13' are kept apart in annual_values
+    (sites, len(annual_years), parameters) and never mixed into the monthly reductions. Missing values are NaN.
+    """
+
+    def __init__(self, keys, values, parameters, annual_years=(), annual_values=None):
+        self.keys = list(keys)
+        self.years = np.array([int(key[:4]) for key in self.keys], dtype=int)
+        self.months = np.array([int(key[4:6]) for key in self.keys], dtype=int)
+        self.values = np.asarray(values, dtype=float)
+        self.parameters = list(parameters)
+        self.annual_years = np.asarray(annual_years, dtype=int)
+        if annual_values is None:
+            annual_values = np.full((self.values.shape[0], len(self.annual_years), len(self.parameters)), np.nan)
+        self.annual_values = np.asarray(annual_values, dtype=float)
+
+    @classmethod
+    def from_responses(cls, responses, parameters, temporal="monthly"):
+        # responses is a list of POWER responses (None for failed sites); sites sharing a response are converted once
+        all_keys = sorted({
+            key
+            for data in responses if data is not None
+            for parameter_values in data['properties']['parameter'].values()
+            for key in parameter_values
+        })
+        annual = [key for key in all_keys if temporal == "monthly" and key[-2:] == "13"]
+        keys = [key for key in all_keys if not (temporal == "monthly" and key[-2:] == "13")]
+        columns = keys + annual
+
+        table = np.full((len(responses), len(columns), len(parameters)), np.nan)
+        converted = {}
+        for site, data in enumerate(responses):
+            if data is None:
+                continue
+            if id(data) not in converted:
+                parameter_data = data['properties']['parameter']
+                converted[id(data)] = np.array(
+                    [[parameter_data.get(parameter, {}).get(key, np.nan) for parameter in parameters] for key in columns],
+                    dtype=float
+                ).reshape(len(columns), len(parameters))
+            table[site] = converted[id(data)]
+        table[table == FILL_VALUE] = np.nan
+        return cls(keys, table[:, :len(keys)], parameters, [int(key[:4]) for key in annual], table[:, len(keys):])
+
+    @classmethod
+    def from_series(cls, series, parameter="value"):
+        # A single {key: value} dict, e.g. what get_temperature_data or get_monthly_precipitation return
+        return cls.from_responses([{"properties": {"parameter": {parameter: series}}}], [parameter])
+
+    def monthly(self, reduce="mean"):
+        # (sites, 12, parameters): each calendar month reduced over the years
+        return group_reduce(self.values, self.months - 1, 12, reduce)
+
+    def seasonal(self, reduce="sum", lats=None):
+        """
+        (sites, 4, parameters) in the order of SEASONS. Seasons follow the northern hemisphere unless
+        lats is given, in which case sites with lats < 0 use southern seasons (Winter = JJA).
+        """
+        if lats is None:
+            return group_reduce(self.values, NORTHERN_SEASON_OF_MONTH[self.months - 1], 4, reduce)
+        southern = np.broadcast_to(np.asarray(lats, dtype=float) < 0, (self.values.shape[0],))
+        groups = np.where(
+            southern[:, None], SOUTHERN_SEASON_OF_MONTH[self.months - 1][None, :], NORTHERN_SEASON_OF_MONTH[self.months - 1][None, :]
+        )
+        return group_reduce(self.values, groups, 4, reduce)
+
+    def annual(self, reduce="mean"):
+        # (years, (sites, years, parameters)) computed from the timesteps of each year
+        years = np.unique(self.years)
+        return years, group_reduce(self.values, np.searchsorted(years, self.years), len(years), reduce)
+
+    def mean(self):
+        # (sites, parameters): mean over every timestep of the period (annual 'YYYY13' values excluded)
+        return nan_mean(self.values, axis=1)
+
+    def parameter(self, name):
+        # (sites, timesteps) values of one parameter
+        return self.values[:, :, self.parameters.index(name)]
+
+
+if __name__ == "__main__":
+    from NasaPower import get_power_data_batch
+
+    # Example usage: seasonal rainfall and monthly temperature for sites on both hemispheres
+    sites = [(37.98, 23.73), (-33.87, 151.21)]
+    responses = get_power_data_batch(sites, 2017, 2019, ["PRECTOTCORR", "T2M"], community="SB")
+    series = PowerSeries.from_responses(responses, ["PRECTOTCORR", "T2M"])
+
+    rainfall = series.seasonal("sum", lats=[lat for lat, _ in sites])[:, :, 0]
+    temperature = series.monthly()[:, :, 1]
+    for (lat, lon), site_rainfall, site_temperature in zip(sites, rainfall, temperature):
+        print(f"({lat}, {lon}) seasonal rainfall:", dict(zip(SEASONS, np.round(site_rainfall, 1).tolist())))
+        print(f"({lat}, {lon}) monthly mean temperature:", np.round(site_temperature, 1).tolist())
@@ -1,16 +1,34 @@
-import requests
+# Description: Road and substation proximity for batches of sites. Roads come from a locally indexed OSM
+# extract (every highway=* way densified into a KD-tree, see OsmIndex) and substations from the power index,
+# so nearest road distance, road class and substation distance are vectorized queries instead of two
+# Google Places nearbysearch requests per site. Distance rasters can be precomputed for a region.
+
+import os
+
+import numpy as np
 import pandas as pd
+import rasterio
+from rasterio.transform import Affine
+
+from DemRaster import DemRaster
+from FetchEngine import send
+from OsmIndex import OSM_EXTRACT_PATH, OsmIndex, get_power_index
 
 # Google API key
 API_KEY = ""
 
-# Location Coordinates (Example: Athens, Greece)
-latitude, longitude = 38.563210, 22.616250
+ROAD_INDEX_PATH = os.environ.get("ROAD_INDEX_PATH", "road_index.npz")
+
+# Values of the highway=* tag that are indexed, from the largest road class to the smallest
+ROAD_TYPES = [
+    "motorway", "trunk", "primary", "secondary", "tertiary", "unclassified", "residential", "service", "track",
+    "motorway_link", "trunk_link", "primary_link", "secondary_link", "tertiary_link",
+]
 
 # Search Parameters
 radius = 3000  # Search within 3 km radius
 
-def get_nearby_places(place_type):
+def get_nearby_places(latitude, longitude, place_type, radius=radius):
     url = (
         f"https://maps.googleapis.com/maps/api/place/nearbysearch/json"
         f"?location={latitude},{longitude}"
@@ -18,7 +36,7 @@ def get_nearby_places(place_type):
         f"&type={place_type}"
         f"&key={API_KEY}"
     )
-    response = requests.get(url)
+    response = send("google_places", url)
     if response.status_code == 200:
         places = response.json().get('results', [])
         return places
@@ -26,10 +44,6 @@ def get_nearby_places(place_type):
         print("Failed to retrieve data:", response.status_code)
         return []
 
-# Find Nearby Roads (Google Places does not directly support roads, use 'route' as a type)
-roads = get_nearby_places('route')
-substations = get_nearby_places('electric_substation')
-
 # Function to create a DataFrame
 def create_dataframe(places, place_type):
     data = []
@@ -41,20 +55,104 @@ def create_dataframe(places, place_type):
         data.append({'Name': name, 'Address': address, 'Latitude': lat, 'Longitude': lng, 'Type': place_type})
     return pd.DataFrame(data)
 
-# Create DataFrames for roads and substations
-df_roads = create_dataframe(roads, 'Road')
-df_substations = create_dataframe(substations, 'Substation')
+# Function to get the road index, building it from the extract on the first run and loading it afterwards
+def get_road_index(index_path=ROAD_INDEX_PATH, extract_path=OSM_EXTRACT_PATH):
+    if os.path.exists(index_path):
+        return OsmIndex.load(index_path)
+    index = OsmIndex.from_osm(extract_path, types=ROAD_TYPES, key="highway")
+    index.save(index_path)
+    return index
+
+# Function to get the nearest road and substation for many sites
+def get_road_proximity(lats, lons, road_index=None, power_index=None, road_types=None, max_distance=None):
+    """
+    Returns a dict of arrays: road_distance (m), road_class (highway value) and road_osm_id of the nearest
+    road (optionally only of road_types), and substation_distance (m). Sites with nothing within
+    max_distance (m) get distance inf. The indexes default to get_road_index() and get_power_index().
+    """
+    road_index = road_index or get_road_index()
+    power_index = power_index or get_power_index()
+    road = road_index.nearest(lats, lons, types=road_types, max_distance=max_distance)
+    substation = power_index.nearest(lats, lons, types=["substation"], max_distance=max_distance)
+    return {
+        "road_distance": road["distance"],
+        "road_class": road["type"],
+        "road_osm_id": road["osm_id"],
+        "substation_distance": substation["distance"],
+    }
+
+# Function to score sites 1 when a road is within radius metres and 0 otherwise
+def road_score(road_distance, radius=radius):
+    return (np.asarray(road_distance) <= radius).astype(int)
+
+# Function to precompute the distance (m) to the nearest indexed feature on a regular grid
+def build_distance_raster(index, bbox, resolution=0.001, types=None, max_distance=None):
+    """
+    bbox is (lat_min, lon_min, lat_max, lon_max) and resolution the pixel size in degrees. Returns a
+    DemRaster (float32, inf where nothing is within max_distance) whose pixels hold the distance at their
+    centres, so later lookups are a single array read per site.
+    """
+    lat_min, lon_min, lat_max, lon_max = bbox
+    height = int(np.ceil((lat_max - lat_min) / resolution))
+    width = int(np.ceil((lon_max - lon_min) / resolution))
+    lats = lat_max - (np.arange(height) + 0.5) * resolution
+    lons = lon_min + (np.arange(width) + 0.5) * resolution
+    grid_lats, grid_lons = np.meshgrid(lats, lons, indexing="ij")
+    distance = index.nearest(grid_lats, grid_lons, types=types, max_distance=max_distance)["distance"]
+    return DemRaster.from_array(distance.reshape(height, width).astype(np.float32), lon_min, lat_max, resolution, resolution)
+
+# Function to write a distance raster as an uncompressed GeoTIFF (DemRaster.open memory-maps it back)
+def save_distance_raster(raster, path):
+    profile = {
+        "driver": "GTiff", "dtype": "float32", "count": 1, "height": raster.height, "width": raster.width,
+        "crs": "EPSG:4326", "transform": Affine(raster.res_lon, 0, raster.west, 0, -raster.res_lat, raster.north),
+    }
+    with rasterio.open(path, "w", **profile) as dataset:
+        dataset.write(np.asarray(raster.data, dtype=np.float32), 1)
+
+# Function to read the distance of many sites from a distance raster (NaN outside it)
+def lookup_distance(raster, lats, lons):
+    rows, cols = raster.to_pixel(lats, lons)
+    inside = (rows >= 0) & (rows < raster.height) & (cols >= 0) & (cols < raster.width)
+    distance = np.full(len(rows), np.nan)
+    if isinstance(raster.data, np.ndarray):
+        # In-memory or memory-mapped rasters are read pixel by pixel
+        distance[inside] = raster.data[rows[inside], cols[inside]]
+    elif inside.any():
+        # Otherwise one window covering the sites, rather than a read per site
+        r0, r1, c0, c1 = rows[inside].min(), rows[inside].max() + 1, cols[inside].min(), cols[inside].max() + 1
+        window = raster.read_window(r0, r1, c0, c1)
+        distance[inside] = window[rows[inside] - r0, cols[inside] - c0]
+    return distance
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
 
-# Combine DataFrames
-df_all = pd.concat([df_roads, df_substations], ignore_index=True)
+    from OsmIndex import write_sample_extract
 
-# Display the results
-print(df_all)
+    # Example usage: index the sample extract, then query road and substation proximity for many sites
+    with tempfile.TemporaryDirectory() as directory:
+        extract = os.path.join(directory, "sample.osm")
+        write_sample_extract(extract)
+        road_index = OsmIndex.from_osm(extract, types=ROAD_TYPES, key="highway")
+        power_index = OsmIndex.from_osm(extract)
 
-if df_all.empty:
-    print("No places found.")
-    score = 0 # No roads nearby
-else:
-    score = 1 # Roads nearby
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(37.8, 38.2, 1000000)
+    lons = rng.uniform(23.5, 24.0, 1000000)
+    start = time.perf_counter()
+    proximity = get_road_proximity(lats, lons, road_index, power_index)
+    print(f"Road and substation proximity for {len(lats):,} sites in {time.perf_counter() - start:.2f} s")
+    for i in range(3):
+        print(
+            f"({lats[i]:.4f}, {lons[i]:.4f}): {proximity['road_class'][i]} road at {proximity['road_distance'][i]:.0f} m, "
+            f"substation at {proximity['substation_distance'][i]:.0f} m, score {road_score(proximity['road_distance'][i])}"
+        )
 
-print(score)
\ No newline at end of file
+    # Precomputed raster for the region, then O(1) lookups
+    start = time.perf_counter()
+    raster = build_distance_raster(road_index, (37.8, 23.5, 38.2, 24.0), resolution=0.001)
+    print(f"{raster.height}x{raster.width} road distance raster in {time.perf_counter() - start:.2f} s")
+    print("Raster lookup (m):", np.round(lookup_distance(raster, lats[:3], lons[:3])).tolist())
@@ -0,0 +1,166 @@
+# Description: Satellite imagery from the Google Static Maps API as in-memory tiles. Images are returned as bytes
+# (never written to a shared file), many (lat, lon, zoom, size) requests are fetched concurrently through FetchEngine,
+# every image is kept in an LRU disk cache keyed by its rounded centre and zoom, and adjacent tiles can be stitched
+# into one mosaic covering a whole parcel.
+
+import io
+import math
+import os
+
+from DiskCache import CACHE_DIR, DiskCache, make_key
+from FetchEngine import fetch_all, send
+
+STATIC_MAPS_URL = "https://maps.googleapis.com/maps/api/staticmap"
+
+# Google API key
+API_KEY = os.environ.get("GOOGLE_MAPS_API_KEY", "")
+
+TILE_CACHE_PATH = os.environ.get("TILE_CACHE_PATH", os.path.join(CACHE_DIR, "satellite_tiles.sqlite"))
+TILE_CACHE_BYTES = 1024 * 1024 * 1024
+
+# Centres are rounded to this many decimals (about 1 m) so requests for the same view share a cache entry
+CENTER_DECIMALS = 5
+
+# Mosaic tiles are requested this much taller and cropped, to cut off the Google logo and attribution
+LOGO_MARGIN = 30
+MAX_TILE_SIZE = 640 - 2 * LOGO_MARGIN
+
+_tile_cache = None
+
+# Function to get the shared on-disk cache for satellite tiles
+def get_tile_cache():
+    global _tile_cache
+    if _tile_cache is None:
+        _tile_cache = DiskCache(TILE_CACHE_PATH, max_bytes=TILE_CACHE_BYTES)
+    return _tile_cache
+
+# Function to build the URL, query parameters and cache key of a satellite image request
+def get_tile_request(lat, lon, zoom=12, size="600x600", api_key=API_KEY):
+    center = f"{round(lat, CENTER_DECIMALS)},{round(lon, CENTER_DECIMALS)}"
+    params = {"center": center, "zoom": zoom, "size": size, "maptype": "satellite", "key": api_key}
+    key = make_key("static_maps", center, zoom, size, "satellite")
+    return STATIC_MAPS_URL, params, key
+
+# Function to get one satellite image as PNG bytes (None if the request fails)
+def get_satellite_tile(lat, lon, zoom=12, size="600x600", api_key=API_KEY, use_cache=True):
+    url, params, key = get_tile_request(lat, lon, zoom, size, api_key)
+    if use_cache:
+        image = get_tile_cache().get(key)
+        if image is not None:
+            return image
+
+    response = send("google_static_maps", url, params)
+    if response.status_code != 200:
+        print(f"Error: {response.status_code}")
+        return None
+
+    if use_cache:
+        get_tile_cache().put(key, response.content)
+    return response.content
+
+# Function to get one satellite image as PNG bytes, written to path only when one is given (the SateliteLand scripts)
+def get_satellite_image(lat, lon, zoom=12, size="600x600", api_key=API_KEY, path=None):
+    image = get_satellite_tile(lat, lon, zoom, size, api_key)
+
+    if image is not None and path is not None:
+        # Save the image to a file
+        with open(path, "wb") as file:
+            file.write(image)
+        print(f"Satellite image saved to {path}")
+    return image
+
+# Function to get many satellite images concurrently
+def get_satellite_tiles(tiles, api_key=API_KEY, use_cache=True, **engine_options):
+    """
+    tiles is a list of (lat, lon, zoom, size). Returns one PNG bytes object per tile, in order (None for
+    failed requests). Cached tiles are served from disk; the rest are fetched concurrently with the
+    google_static_maps rate limits of FetchEngine.
+    """
+    images = [None] * len(tiles)
+    missing = {}
+    for index, (lat, lon, zoom, size) in enumerate(tiles):
+        url, params, key = get_tile_request(lat, lon, zoom, size, api_key)
+        image = get_tile_cache().get(key) if use_cache else None
+        if image is not None:
+            images[index] = image
+        else:
+            # Identical requests in the batch are fetched once
+            missing.setdefault(key, (url, params, []))[2].append(index)
+
+    keys = list(missing)
+    requests = [{"provider": "google_static_maps", "url": missing[key][0], "params": missing[key][1]} for key in keys]
+    for key, image in zip(keys, fetch_all(requests, parse="bytes", **engine_options)):
+        if isinstance(image, Exception):
+            print(f"Failed to retrieve tile {missing[key][1]['center']}: {image}")
+            continue
+        if use_cache:
+            get_tile_cache().put(key, image)
+        for index in missing[key][2]:
+            images[index] = image
+    return images
+
+# Function to convert latitude/longitude into Web Mercator world pixel coordinates at a zoom level (256 px world tile)
+def to_world_pixel(lat, lon, zoom):
+    size = 256 * 2 ** zoom
+    siny = min(max(math.sin(math.radians(lat)), -0.9999), 0.9999)
+    x = (lon + 180) / 360 * size
+    y = (0.5 - math.log((1 + siny) / (1 - siny)) / (4 * math.pi)) * size
+    return x, y
+
+# Function to convert Web Mercator world pixel coordinates back into latitude/longitude
+def from_world_pixel(x, y, zoom):
+    size = 256 * 2 ** zoom
+    lon = x / size * 360 - 180
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / size))))
+    return lat, lon
+
+# Function to stitch satellite tiles into one image covering a parcel
+def get_parcel_mosaic(bbox, zoom=17, tile_size=MAX_TILE_SIZE, api_key=API_KEY, use_cache=True, **engine_options):
+    """
+    bbox is (lat_min, lon_min, lat_max, lon_max). The parcel is covered with adjacent tiles of tile_size pixels
+    (requested LOGO_MARGIN taller on both sides, which is cropped off), fetched concurrently and pasted into a
+    PIL image cropped to the bbox. Tiles that fail are left black.
+    """
+    from PIL import Image
+
+    lat_min, lon_min, lat_max, lon_max = bbox
+    left, top = to_world_pixel(lat_max, lon_min, zoom)
+    right, bottom = to_world_pixel(lat_min, lon_max, zoom)
+    cols = max(1, math.ceil((right - left) / tile_size))
+    rows = max(1, math.ceil((bottom - top) / tile_size))
+
+    size = f"{tile_size}x{tile_size + 2 * LOGO_MARGIN}"
+    centers = [
+        from_world_pixel(left + (col + 0.5) * tile_size, top + (row + 0.5) * tile_size, zoom)
+        for row in range(rows) for col in range(cols)
+    ]
+    images = get_satellite_tiles([(lat, lon, zoom, size) for lat, lon in centers], api_key, use_cache, **engine_options)
+
+    mosaic = Image.new("RGB", (cols * tile_size, rows * tile_size))
+    for index, image in enumerate(images):
+        if image is None:
+            continue
+        tile = Image.open(io.BytesIO(image)).convert("RGB")
+        tile = tile.crop((0, LOGO_MARGIN, tile_size, LOGO_MARGIN + tile_size))
+        mosaic.paste(tile, ((index % cols) * tile_size, (index // cols) * tile_size))
+    return mosaic.crop((0, 0, round(right - left), round(bottom - top)))
+
+# Function to encode a PIL image (e.g. a mosaic) as PNG bytes
+def image_to_bytes(image, format="PNG"):
+    buffer = io.BytesIO()
+    image.save(buffer, format=format)
+    return buffer.getvalue()
+
+
+if __name__ == "__main__":
+    # Example usage: one tile, a batch around it and a mosaic of a small parcel, all in memory
+    lat, lon = 37.074208, 21.824312
+    image = get_satellite_tile(lat, lon, zoom=17, size="600x600")
+    print("Single tile:", "failed" if image is None else f"{len(image):,} bytes")
+
+    tiles = get_satellite_tiles([(lat + 0.01 * i, lon, 16, "600x600") for i in range(5)])
+    print("Batch:", [None if tile is None else len(tile) for tile in tiles])
+
+    mosaic = get_parcel_mosaic((lat - 0.003, lon - 0.004, lat + 0.003, lon + 0.004), zoom=17)
+    print(f"Parcel mosaic: {mosaic.size[0]}x{mosaic.size[1]} px, {len(image_to_bytes(mosaic)):,} bytes as PNG")
+    print("Tile cache:", get_tile_cache().stats())
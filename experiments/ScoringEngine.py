@@ -0,0 +1,132 @@
+# Description: Configurable scoring engine. Loads weights, normalizations and penalty thresholds from
+# declarative profiles (per technology and region, see EfficiencyScores/profiles.json), compiles a
+# profile into a vectorized evaluator and re-scores stored site features without fetching anything.
+
+import json
+import os
+import tempfile
+
+import numpy as np
+
+PROFILES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "EfficiencyScores", "profiles.json")
+
+# Normalizations a profile can apply to a feature; each keeps the operation order of calculate_efficiency
+TRANSFORMS = {
+    # 1/(1+k*((x-optimum)**2)), peaks at the optimum (temperature); squared as d*d like calculate_efficiency
+    "optimum": lambda x, p: 1/(1+p["sharpness"]*((x-p["optimum"])*(x-p["optimum"]))),
+    # (max - x) / max, lower values are better (cloud cover)
+    "lower_is_better": lambda x, p: (p["max"] - x) / p["max"],
+    # x / max, higher values are better (irradiance)
+    "scale": lambda x, p: x / p["max"],
+    # (x + offset) / scale up to cap, 1 above it (elevation)
+    "offset_capped": lambda x, p: np.where(x <= p["cap"], (x + p["offset"]) / p["scale"], 1),
+}
+
+# Function to load every profile from a JSON file, keyed by "technology/region"
+def load_profiles(path=PROFILES_PATH):
+    with open(path) as file:
+        return json.load(file)
+
+# Function to get the profile for a technology and region, falling back to the technology's default
+def get_profile(technology, region="default", profiles=None):
+    profiles = profiles or load_profiles()
+    key = f"{technology}/{region}"
+    if key not in profiles:
+        key = f"{technology}/default"
+    if key not in profiles:
+        raise KeyError(f"No scoring profile for {technology}/{region}")
+    return profiles[key]
+
+# Function to compile a profile into a function that scores arrays of site features
+def compile_profile(profile):
+    """
+    Returns evaluate(features) where features maps feature names to equal-length arrays
+    (a dict, structured array or DataFrame) and the result is an array of scores.
+    Features with weight 0 are skipped, so they may be missing from the input.
+    Penalties are checked in order and only the first that applies is subtracted.
+    """
+    terms = [
+        (name, TRANSFORMS[spec["transform"]], spec, spec["weight"])
+        for name, spec in profile["features"].items()
+        if spec["weight"] != 0
+    ]
+    penalties = profile.get("penalties", [])
+    scale = profile.get("scale", 1)
+    low, high = profile.get("clamp", (-np.inf, np.inf))
+
+    def evaluate(features):
+        score = 0
+        for name, transform, spec, weight in terms:
+            score = score + (transform(np.asarray(features[name], dtype=float), spec) * weight)
+        score = np.asarray(score * scale, dtype=float)
+
+        if penalties:
+            score = np.select(
+                [np.asarray(features[p["feature"]], dtype=float) > p["above"] for p in penalties],
+                [score - p["subtract"] for p in penalties],
+                score
+            )
+        # Same comparisons as max(low, min(high, score))
+        score = np.where(score < high, score, float(high))
+        return np.where(score > low, score, float(low))
+
+    return evaluate
+
+# Function to store a batch of site features (name -> array) so it can be re-scored later
+def save_features(path, features):
+    np.savez_compressed(path, **{name: np.asarray(values) for name, values in features.items()})
+
+# Function to load a batch of site features saved with save_features
+def load_features(path):
+    with np.load(path) as file:
+        return {name: file[name] for name in file.files}
+
+# Function to re-score stored features under a profile, without any network calls
+def rescore(features, profile):
+    """
+    features is a mapping of feature arrays or the path of a file written by save_features;
+    profile is a profile dict or its "technology/region" key.
+    """
+    if isinstance(features, str):
+        features = load_features(features)
+    if isinstance(profile, str):
+        profile = get_profile(*profile.split("/"))
+    return compile_profile(profile)(features)
+
+# Function to generate random site features for the example and the consistency check
+def random_features(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "temp": rng.uniform(-5, 35, n),
+        "cloud": rng.uniform(0, 100, n),
+        "solar": rng.uniform(0, 1000, n),
+        "elevation": rng.uniform(0, 2000, n),
+        "slope": rng.uniform(0, 30, n),
+    }
+
+# Function to check that solar/default scores bit-identically to calculate_efficiency on random sites
+def check_solar_default(n=10000, seeds=(0, 1, 2, 3, 4)):
+    from EfficiencyScores.SolarScore import calculate_efficiency
+
+    for seed in seeds:
+        features = random_features(n, seed)
+        scores = rescore(features, "solar/default")
+        columns = [features[name].tolist() for name in ("temp", "cloud", "solar", "elevation", "slope")]
+        expected = np.array([calculate_efficiency(*site) for site in zip(*columns)])
+        if not np.array_equal(scores.view(np.int64), expected.view(np.int64)):
+            raise AssertionError(f"solar/default differs from calculate_efficiency (seed {seed})")
+    return True
+
+
+if __name__ == "__main__":
+    check_solar_default()
+    print("solar/default is bit-identical to calculate_efficiency on random sites")
+
+    # Example usage: score a stored batch under every profile (stored in a temporary directory, not the working one)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "site_features.npz")
+        save_features(path, random_features(100000))
+
+        for name in load_profiles():
+            scores = rescore(path, name)
+            print(f"{name}: mean score {scores.mean():.2f} over {len(scores)} sites")
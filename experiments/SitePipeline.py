@@ -0,0 +1,272 @@
+# Description: Site analysis pipeline. Declares the experiment stages (POWER climate data, terrain, grid and road
+# proximity, land cover, efficiency score, ...) as nodes of a DAG with their dependencies, runs independent I/O
+# stages concurrently on a thread pool, memoizes every node's output per site and returns one structured result,
+# so a full site assessment takes about as long as its slowest stage instead of the sum of all of them.
+
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+# Coordinates are rounded to this many decimals (about 0.1 m) to key memoized outputs
+MEMO_DECIMALS = 6
+
+class Stage:
+    """
+    One node of the pipeline. func is called as func(lat, lon, **inputs) with the outputs of the stages
+    named in inputs; io stages run on the thread pool, the others in the scheduling thread once their inputs
+    are ready. A batch stage runs once per run_many on the thread pool as func(sites, **inputs), with the
+    sites that need it and one list per input, and returns one output per site (for APIs that group or
+    deduplicate requests themselves). A stage that raises or returns None fails, and the stages depending
+    on it are skipped.
+    """
+
+    def __init__(self, name, func, inputs=(), io=False, batch=False):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.io = io
+        self.batch = batch
+
+class SitePipeline:
+    """
+    DAG of Stages run for one or many sites. Outputs are memoized per (stage, site) for the lifetime of
+    the pipeline, so later runs (or other targets) for the same site only compute what is missing.
+    """
+
+    def __init__(self, stages=(), max_workers=16):
+        self.stages = {}
+        self.max_workers = max_workers
+        self._memo = {}
+        for stage in stages:
+            self.add_stage(stage)
+
+    def add_stage(self, stage):
+        if stage.name in self.stages:
+            raise ValueError(f"Stage {stage.name} is already defined")
+        self.stages[stage.name] = stage
+
+    def order(self, targets=None):
+        # Stages needed for the targets (all by default) in dependency order
+        ordered, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name not in self.stages:
+                raise KeyError(f"Unknown stage {name}")
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through stage {name}")
+            visiting.add(name)
+            for dependency in self.stages[name].inputs:
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+            ordered.append(name)
+
+        for name in (targets or self.stages):
+            visit(name)
+        return ordered
+
+    def _memo_key(self, name, lat, lon):
+        return (name, round(lat, MEMO_DECIMALS), round(lon, MEMO_DECIMALS))
+
+    def run_many(self, sites, targets=None):
+        """
+        Runs the stages needed for targets (all by default) for every (lat, lon) in sites. Returns one dict per
+        site with values (stage outputs), errors (why a stage failed or was skipped), timings (seconds per
+        stage computed in this run; memoized ones are left out, batch stages report the whole batch) and
+        elapsed (seconds for the whole run).
+        """
+        start = time.perf_counter()
+        names = self.order(targets)
+        dependents = {name: [] for name in names}
+        for name in names:
+            for dependency in self.stages[name].inputs:
+                dependents[dependency].append(name)
+        results = [{"lat": lat, "lon": lon, "values": {}, "errors": {}, "timings": {}} for lat, lon in sites]
+
+        # A (site, stage) becomes ready once all its inputs are resolved; a batch stage is submitted once
+        # every site has either resolved it or queued for it, so the scheduler never rescans the whole run
+        unresolved = {(site, name): len(self.stages[name].inputs) for site in range(len(results)) for name in names}
+        ready = deque((site, name) for site in range(len(results)) for name in names if not self.stages[name].inputs)
+        batches = {name: [] for name in names if self.stages[name].batch}
+        outstanding = {name: len(results) for name in batches}
+        running = {}
+
+        def finish(site, name, value, error, seconds=None):
+            result = results[site]
+            if error is None and value is None:
+                error = "returned no result"
+            if error is None:
+                result["values"][name] = value
+                self._memo[self._memo_key(name, result["lat"], result["lon"])] = value
+            else:
+                result["errors"][name] = error
+            if seconds is not None:
+                result["timings"][name] = seconds
+            for dependent in dependents[name]:
+                unresolved[(site, dependent)] -= 1
+                if unresolved[(site, dependent)] == 0:
+                    ready.append((site, dependent))
+
+        def timed(stage, lat, lon, inputs):
+            stage_start = time.perf_counter()
+            return stage.func(lat, lon, **inputs), time.perf_counter() - stage_start
+
+        def timed_batch(stage, batch_sites, inputs):
+            stage_start = time.perf_counter()
+            values = list(stage.func(batch_sites, **inputs))
+            if len(values) != len(batch_sites):
+                raise ValueError(f"returned {len(values)} outputs for {len(batch_sites)} sites")
+            return values, time.perf_counter() - stage_start
+
+        def submit_batch(name):
+            stage, batch = self.stages[name], batches[name]
+            batch_sites = [(results[site]["lat"], results[site]["lon"]) for site in batch]
+            inputs = {dependency: [results[site]["values"][dependency] for site in batch] for dependency in stage.inputs}
+            running[executor.submit(timed_batch, stage, batch_sites, inputs)] = (batch, name)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while ready or running:
+                while ready:
+                    site, name = ready.popleft()
+                    stage, result = self.stages[name], results[site]
+                    key = self._memo_key(name, result["lat"], result["lon"])
+                    failed = [dependency for dependency in stage.inputs if dependency in result["errors"]]
+                    if key in self._memo:
+                        finish(site, name, self._memo[key], None)
+                    elif failed:
+                        finish(site, name, None, f"skipped: {', '.join(failed)} failed")
+                    elif stage.batch:
+                        batches[name].append(site)
+                    elif stage.io:
+                        inputs = {dependency: result["values"][dependency] for dependency in stage.inputs}
+                        running[executor.submit(timed, stage, result["lat"], result["lon"], inputs)] = ([site], name)
+                    else:
+                        inputs = {dependency: result["values"][dependency] for dependency in stage.inputs}
+                        try:
+                            value, seconds = timed(stage, result["lat"], result["lon"], inputs)
+                            finish(site, name, value, None, seconds)
+                        except Exception as e:
+                            finish(site, name, None, f"{type(e).__name__}: {e}")
+                    if stage.batch:
+                        outstanding[name] -= 1
+                        if outstanding[name] == 0 and batches[name]:
+                            submit_batch(name)
+
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch, name = running.pop(future)
+                    try:
+                        values, seconds = future.result()
+                        if not self.stages[name].batch:
+                            values = [values]
+                        for site, value in zip(batch, values):
+                            finish(site, name, value, None, seconds)
+                    except Exception as e:
+                        for site in batch:
+                            finish(site, name, None, f"{type(e).__name__}: {e}")
+
+        elapsed = time.perf_counter() - start
+        for result in results:
+            result["elapsed"] = elapsed
+        return results
+
+    def run(self, lat, lon, targets=None):
+        # Structured result of one site (see run_many)
+        return self.run_many([(lat, lon)], targets)[0]
+
+# Function to build the pipeline of the experiment stages for a time window
+def build_site_pipeline(start_year, end_year, move_distance=100, dem=None, worldcover=None, road_index=None, power_index=None):
+    """
+    Stages: power (one POWER request for every monthly analysis and grid cell), temperature, cloud_amount, solar_irradiance,
+    wind_speed_10m, wind_speed_50m, air_density (from PS and T2M), terrain (elevation/slope/aspect, from the
+    Elevation API or a local DemRaster), elevation, slope, solar_efficiency (calculate_efficiency), grid
+    (distance to power infrastructure, one Overpass query per cluster of sites), roads (road and substation proximity from the local OSM indexes) and
+    land_cover (Earth Engine, or a local WorldCover).
+    """
+    # Stage modules are imported here, so custom pipelines do not pay for them
+    from EfficiencyScores.SolarScore import calculate_efficiency
+    from Elevation import get_terrain
+    from GridAvailability import get_grid_distances
+    from LandTypePoint import get_land_cover_type
+    from NasaPower import get_site_power_data_batch
+    from PowerSeries import PowerSeries
+    from RoadsNearby import get_road_proximity, road_score
+    from Solar.CloudCover import get_annual_mean_cloud_amount
+    from Solar.Temperature import calculate_annual_mean_temperature, get_temperature_data
+    from Wind.AirDensity import get_air_density
+    from Wind.WindSpeed import get_wind_speed_10m, get_wind_speed_50m
+
+    def terrain(lat, lon):
+        if dem is not None:
+            return dem.get_terrain([(lat, lon)], move_distance)[0]
+        return get_terrain([(lat, lon)], move_distance)[0]
+
+    def solar_irradiance(lat, lon, power):
+        mean = PowerSeries.from_responses([power], ["ALLSKY_SFC_SW_DWN"]).mean()[0, 0]
+        return None if np.isnan(mean) else float(mean)
+
+    # power and grid are batch stages, so POWER requests are deduplicated per grid cell and Overpass
+    # queries are made per cluster of sites for a whole run_many
+    def power(sites):
+        return get_site_power_data_batch(sites, start_year, end_year)
+
+    def grid(sites):
+        distances = get_grid_distances(sites)
+        # Sites of a cluster whose Overpass request failed (NaN distance) get None
+        return [
+            None if np.isnan(distance) else {"distance": float(distance), "type": str(grid_type), "available": bool(available)}
+            for distance, grid_type, available in zip(distances["distance"], distances["type"], distances["available"])
+        ]
+
+    def roads(lat, lon):
+        proximity = get_road_proximity([lat], [lon], road_index, power_index)
+        return {
+            "road_distance": float(proximity["road_distance"][0]),
+            "road_class": str(proximity["road_class"][0]),
+            "substation_distance": float(proximity["substation_distance"][0]),
+            "score": int(road_score(proximity["road_distance"][0])),
+        }
+
+    def land_cover(lat, lon):
+        code, land_cover_type = get_land_cover_type(lat, lon, worldcover)
+        return {"code": code, "type": land_cover_type}
+
+    return SitePipeline([
+        Stage("power", power, batch=True),
+        Stage("temperature", lambda lat, lon, power: calculate_annual_mean_temperature(
+            get_temperature_data(lat, lon, start_year, end_year, data=power)), ["power"]),
+        Stage("cloud_amount", lambda lat, lon, power: get_annual_mean_cloud_amount(lat, lon, start_year, end_year, data=power), ["power"]),
+        Stage("solar_irradiance", solar_irradiance, ["power"]),
+        Stage("wind_speed_10m", lambda lat, lon, power: get_wind_speed_10m(lat, lon, start_year, end_year, data=power), ["power"]),
+        Stage("wind_speed_50m", lambda lat, lon, power: get_wind_speed_50m(lat, lon, start_year, end_year, data=power), ["power"]),
+        Stage("air_density", lambda lat, lon, power: get_air_density(lat, lon, start_year, end_year, data=power), ["power"]),
+        Stage("terrain", terrain, io=True),
+        Stage("elevation", lambda lat, lon, terrain: terrain["elevation"], ["terrain"]),
+        Stage("slope", lambda lat, lon, terrain: terrain["slope"], ["terrain"]),
+        Stage("solar_efficiency", lambda lat, lon, temperature, cloud_amount, solar_irradiance, elevation, slope: calculate_efficiency(
+            temperature, cloud_amount, solar_irradiance, elevation, slope), ["temperature", "cloud_amount", "solar_irradiance", "elevation", "slope"]),
+        Stage("grid", grid, batch=True),
+        Stage("roads", roads, io=True),
+        Stage("land_cover", land_cover, io=True),
+    ])
+
+
+if __name__ == "__main__":
+    # Example usage: full assessment of one site; the second run is served from the memoized outputs
+    lat, lon = 38.122636, 21.682841
+    pipeline = build_site_pipeline(2020, 2022)
+
+    result = pipeline.run(lat, lon)
+    print(f"Site ({lat}, {lon}) assessed in {result['elapsed']:.2f} s")
+    for name, value in result["values"].items():
+        print(f"  {name}: {value if name != 'power' else '...'} ({result['timings'].get(name, 0):.2f} s)")
+    for name, error in result["errors"].items():
+        print(f"  {name} failed: {error}")
+
+    print(f"Again from memoized outputs in {pipeline.run(lat, lon)['elapsed']:.3f} s")
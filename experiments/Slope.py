@@ -1,6 +1,7 @@
-import requests
 from geopy import distance
 
+from Elevation import get_elevations, get_terrain
+
 # Google Maps Elevation API Key
 API_KEY = ""
 
@@ -26,22 +27,10 @@ print(f"Point 2: {point2}")
 
 # Function to get elevation from Google Maps Elevation API
 def get_elevation(lat, lon):
-    url = f"https://maps.googleapis.com/maps/api/elevation/json?locations={lat},{lon}&key={API_KEY}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        result = response.json()
-        if result['status'] == 'OK':
-            elevation = result['results'][0]['elevation']
-            return elevation
-        else:
-            print(f"Error in API response: {result['status']}")
-    else:
-        print("Failed to connect to the Google Maps API.")
-    return None
-
-# Get elevations for both points
-elevation1 = get_elevation(*point1)
-elevation2 = get_elevation(*point2)
+    return get_elevations([(lat, lon)], API_KEY)[0]
+
+# Get elevations for both points in a single batched request
+elevation1, elevation2 = get_elevations([point1, point2], API_KEY)
 
 print(f"Elevation at Point 1: {elevation1} meters")
 print(f"Elevation at Point 2: {elevation2} meters")
@@ -57,3 +46,7 @@ if elevation1 is not None and elevation2 is not None:
     print(f"Slope: {slope:.2f}%")
 else:
     print("Unable to calculate slope due to missing elevation data.")
+
+# Slope and aspect from a cross of points around Point 1 (north, south, east and west), also in one request
+terrain = get_terrain([point1], move_distance, API_KEY)[0]
+print(f"Terrain at Point 1: {terrain}")
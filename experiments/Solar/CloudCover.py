@@ -1,24 +1,28 @@
+import os
+import sys
+
 import requests
 
-def get_annual_mean_cloud_amount(lat, lon, start_year, end_year):
-    # Construct the URL to get cloud amount data (CLOUD_AMT)
-    url = f"https://power.larc.nasa.gov/api/temporal/monthly/point?parameters=CLOUD_AMT&community=SB&longitude={lon}&latitude={lat}&start={start_year}&end={end_year}&format=JSON"
-    
+# Make the shared modules in experiments/ importable when running this script directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from NasaPower import get_power_data
+from PowerSeries import PowerSeries
+
+def get_annual_mean_cloud_amount(lat, lon, start_year, end_year, data=None):
+    # data can be a NASA POWER response already fetched for the site (see NasaPower.get_site_power_data)
     try:
-        # Make the API request
-        response = requests.get(url)
-        response.raise_for_status()  # Check for HTTP errors
-        
-        # Convert the response to JSON
-        data = response.json()
+        # Make the API request for cloud amount data (CLOUD_AMT)
+        if data is None:
+            data = get_power_data(lat, lon, start_year, end_year, ["CLOUD_AMT"], community="SB")
         
         # Extract cloud amount data (monthly values)
         cloud_amount_data = data['properties']['parameter']['CLOUD_AMT']
         
-        # Calculate the mean cloud cover for the year
-        cloud_amount_values = list(cloud_amount_data.values())  # Get all monthly values
-        if cloud_amount_values:
-            annual_mean_cloud_cover = sum(cloud_amount_values) / len(cloud_amount_values)
+        # Calculate the mean cloud cover over the monthly values (the annual 'YYYY13' values are left out)
+        series = PowerSeries.from_series(cloud_amount_data)
+        if series.keys:
+            annual_mean_cloud_cover = float(series.mean()[0, 0])
         else:
             annual_mean_cloud_cover = 0.0
         
@@ -34,12 +38,13 @@ def get_annual_mean_cloud_amount(lat, lon, start_year, end_year):
         print("Error: Unexpected API response structure. Check API output.")
         return None
 
-# Example Usage
-lat, lon = 37.98, 23.73  # Athens, Greece
-start_year = 2017
-end_year = 2017
+if __name__ == "__main__":
+    # Example Usage
+    lat, lon = 37.98, 23.73  # Athens, Greece
+    start_year = 2017
+    end_year = 2017
 
-annual_mean_cloud_cover = get_annual_mean_cloud_amount(lat, lon, start_year, end_year)
+    annual_mean_cloud_cover = get_annual_mean_cloud_amount(lat, lon, start_year, end_year)
 
-if annual_mean_cloud_cover is not None:
-    print(f"Annual Mean Cloud Amount for {start_year}: {annual_mean_cloud_cover:.2f}%")
+    if annual_mean_cloud_cover is not None:
+        print(f"Annual Mean Cloud Amount for {start_year}: {annual_mean_cloud_cover:.2f}%")
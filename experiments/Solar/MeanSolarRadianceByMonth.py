@@ -1,16 +1,20 @@
+import os
+import sys
+
 import requests
 
-def get_solar_data(lat, lon, year):
-    # Create the URL with the specified year
-    url = f"https://power.larc.nasa.gov/api/temporal/monthly/point?parameters=ALLSKY_SFC_SW_DWN&community=SB&longitude={lon}&latitude={lat}&start={year}&end={year}&format=JSON"
-    
-    try:
-        # Make the API request
-        response = requests.get(url)
-        response.raise_for_status()  # Check for HTTP errors
+# Make the shared modules in experiments/ importable when running this script directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-        # Convert the response to JSON
-        data = response.json()
+from NasaPower import get_power_data
+from PowerSeries import PowerSeries
+
+def get_solar_data(lat, lon, year, data=None):
+    # data can be a NASA POWER response already fetched for the site (see NasaPower.get_site_power_data)
+    try:
+        # Make the API request for the specified year
+        if data is None:
+            data = get_power_data(lat, lon, year, year, ["ALLSKY_SFC_SW_DWN"], community="SB")
         
         # Debugging: print the structure of the data response to understand it better
         # print("API Response:", data)
@@ -30,22 +34,17 @@ def get_solar_data(lat, lon, year):
         return None
 
 # Function to calculate the mean solar irradiance by month and the total mean for the year
-def calculate_monthly_mean_and_total(lat, lon, year):
+def calculate_monthly_mean_and_total(lat, lon, year, data=None):
     # Fetch solar data for the given year
-    solar_data = get_solar_data(lat, lon, year)
+    solar_data = get_solar_data(lat, lon, year, data=data)
     
     if solar_data:
-        # Create a list for monthly solar irradiance data
-        mean_monthly_irradiance = {}
+        # Map the solar data to calendar months (keys are in the format 'YYYYMM'; the annual 'YYYY13' value is left out)
+        series = PowerSeries.from_series(solar_data)
+        mean_monthly_irradiance = dict(zip(range(1, 13), series.monthly()[0, :, 0].tolist()))
 
-        # We loop through the solar data and map it to months
-        for key, irradiance in solar_data.items():
-            # Extract the month from the key (which is in the format 'YYYYMM')
-            month = int(key[4:6])  # Extract the last two digits of the year-month (i.e., '01', '02', ...)
-            mean_monthly_irradiance[month] = irradiance
-        
         # Calculate the total mean for the year (the mean of all 12 months)
-        total_mean = sum(mean_monthly_irradiance.values()) / len(mean_monthly_irradiance)
+        total_mean = float(series.mean()[0, 0])
         
         # Print the mean for each month
         print(f"Monthly Solar Irradiance for {year}:")
@@ -57,8 +56,9 @@ def calculate_monthly_mean_and_total(lat, lon, year):
     else:
         print(f"Could not retrieve data for year {year}.")
 
-# Test the function (e.g., Athens, Greece, for year 2017)
-lat, lon = 37.98, 23.73
-year = 2017
+if __name__ == "__main__":
+    # Test the function (e.g., Athens, Greece, for year 2017)
+    lat, lon = 37.98, 23.73
+    year = 2017
 
-calculate_monthly_mean_and_total(lat, lon, year)
+    calculate_monthly_mean_and_total(lat, lon, year)
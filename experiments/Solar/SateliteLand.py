@@ -1,19 +1,12 @@
-import requests
+import os
+import sys
 
-def get_satellite_image(lat, lon, zoom=12, size="600x600", api_key="api"):
+# Make the shared modules in experiments/ importable when running this script directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-    url = f"https://maps.googleapis.com/maps/api/staticmap?center={lat},{lon}&zoom={zoom}&size={size}&maptype=satellite&key={api_key}"
-    
-    response = requests.get(url)
+from SatelliteTiles import get_satellite_image
 
-    if response.status_code == 200:
-        # Save the image to a file
-        with open("satellite_image.png", "wb") as file:
-            file.write(response.content)
-        print("Satellite image saved successfully!")
-    else:
-        print(f"Error: {response.status_code}")
-
-# Example Usage
-API_KEY = ""
-get_satellite_image(39.074208, 21.824312, zoom=16, size="600x600", api_key=API_KEY)
+if __name__ == "__main__":
+    # Example Usage
+    lat, lon, zoom = 39.074208, 21.824312, 16
+    get_satellite_image(lat, lon, zoom=zoom, size="600x600", path=f"satellite_{lat}_{lon}_{zoom}.png")
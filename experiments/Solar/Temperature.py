@@ -1,20 +1,25 @@
+import csv
+import os
+import sys
+
 import requests
 
-def get_temperature_data(lat, lon, start_year, end_year):
-    # Construct the URL to get temperature data (T2M - 2-meter air temperature)
-    url = f"https://power.larc.nasa.gov/api/temporal/monthly/point?parameters=T2M&community=SB&longitude={lon}&latitude={lat}&start={start_year}&end={end_year}&format=JSON"
-    
+# Make the shared modules in experiments/ importable when running this script directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from NasaPower import get_power_data
+from PowerSeries import PowerSeries
+
+def get_temperature_data(lat, lon, start_year, end_year, data=None):
+    # data can be a NASA POWER response already fetched for the site (see NasaPower.get_site_power_data)
     try:
-        # Make the API request
-        response = requests.get(url)
-        response.raise_for_status()  # Check for HTTP errors
-        
-        # Convert the response to JSON
-        data = response.json()
-        
+        # Make the API request for temperature data (T2M - 2-meter air temperature)
+        if data is None:
+            data = get_power_data(lat, lon, start_year, end_year, ["T2M"], community="SB")
+
         # Extract temperature data (monthly values)
         temperature_data = data['properties']['parameter']['T2M']
-        
+
         return temperature_data
 
     except requests.exceptions.RequestException as e:
@@ -27,53 +32,30 @@ def get_temperature_data(lat, lon, start_year, end_year):
         print("Error: Unexpected API response structure. Check API output.")
         return None
 
-# Example Usage
-lat, lon = 37.98, 23.73  # Athens, Greece
-start_year = 2020
-end_year = 2020
-
-temperature = get_temperature_data(lat, lon, start_year, end_year)
-
-if temperature:
-    print("Temperature Data:", temperature)
-
 def calculate_annual_mean_temperature(temperature_data):
-    # Extract the temperature values (e.g., from the dictionary)
-    temperature_values = list(temperature_data.values())
-    
+    # Convert the monthly values (the annual 'YYYY13' values are kept apart)
+    series = PowerSeries.from_series(temperature_data)
+
     # Calculate the mean temperature for the year
-    if temperature_values:
-        annual_mean_temp = sum(temperature_values) / len(temperature_values)
+    if series.keys:
+        annual_mean_temp = float(series.mean()[0, 0])
         return annual_mean_temp
     else:
         return None
 
-# Example Usage
-if temperature:
-    annual_mean_temp = calculate_annual_mean_temperature(temperature)
-    if annual_mean_temp is not None:
-        print(f"Annual Mean Temperature: {annual_mean_temp:.2f} °C")
-    else:
-        print("No temperature data available.")
-
 # save_to_csv function
-import csv
-
 def save_to_csv(temperature_data, filename='temperature_data.csv'):
     # Open a file to write
     with open(filename, mode='w', newline='') as file:
         writer = csv.writer(file)
         # Write the header
         writer.writerow(["Date", "Temperature (°C)"])
-        
+
         # Write each key-value pair
         for date, temp in temperature_data.items():
             writer.writerow([date, temp])
-    
-    print(f"Data saved to {filename}")
 
-if temperature:
-    save_to_csv(temperature)
+    print(f"Data saved to {filename}")
 
 # save_to_json function
 """
@@ -86,4 +68,26 @@ def save_to_json(temperature_data, filename='temperature_data.json'):
 
 if temperature:
     save_to_json(temperature)
-"""
\ No newline at end of file
+"""
+
+if __name__ == "__main__":
+    # Example Usage
+    lat, lon = 37.98, 23.73  # Athens, Greece
+    start_year = 2020
+    end_year = 2020
+
+    temperature = get_temperature_data(lat, lon, start_year, end_year)
+
+    if temperature:
+        print("Temperature Data:", temperature)
+
+    # Example Usage
+    if temperature:
+        annual_mean_temp = calculate_annual_mean_temperature(temperature)
+        if annual_mean_temp is not None:
+            print(f"Annual Mean Temperature: {annual_mean_temp:.2f} °C")
+        else:
+            print("No temperature data available.")
+
+    if temperature:
+        save_to_csv(temperature)
@@ -1,13 +1,19 @@
+import os
+import sys
+
 import requests
 
-def get_air_density(lat, lon, start_year, end_year):
-    # NASA POWER API URL
-    url = f"https://power.larc.nasa.gov/api/temporal/monthly/point?parameters=PS,T2M&community=SB&longitude={lon}&latitude={lat}&start={start_year}&end={end_year}&format=JSON"
+# Make the shared modules in experiments/ importable when running this script directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from NasaPower import get_power_data
 
-    response = requests.get(url)
-    
+def get_air_density(lat, lon, start_year, end_year, data=None):
+    # data can be a NASA POWER response already fetched for the site (see NasaPower.get_site_power_data)
     try:
-        data = response.json()
+        # NASA POWER API request for surface pressure and temperature
+        if data is None:
+            data = get_power_data(lat, lon, start_year, end_year, ["PS", "T2M"], community="SB")
         
         # Extract pressure (PS) and temperature (T2M)
         pressure_data = data['properties']['parameter']['PS']
@@ -32,12 +38,17 @@ def get_air_density(lat, lon, start_year, end_year):
     except (requests.exceptions.JSONDecodeError, KeyError) as e:
         print("Error: Unexpected API response structure. Check API output.")
         return None
+    except requests.exceptions.RequestException as e:
+        print(f"Request Error: {e}")
+        return None
+
+if __name__ == "__main__":
+    # Example usage
+    latitude = 37.98
+    longitude = 23.73
+    start_year = 2017
+    end_year = 2018
 
-# Example usage
-latitude = 37.98
-longitude = 23.73
-start_year = 2017
-end_year = 2018
+    air_density = get_air_density(latitude, longitude, start_year, end_year)
+    print("Monthly Air Density (kg/m³):", air_density)
 
-air_density = get_air_density(latitude, longitude, start_year, end_year)
-print("Monthly Air Density (kg/m³):", air_density)
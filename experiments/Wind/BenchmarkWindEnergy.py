@@ -0,0 +1,48 @@
+# Description: Benchmark of the Weibull fit and AEP estimate in WindEnergy.py. Checks that the vectorized fit
+# recovers known parameters and matches fitting one site at a time, and reports how throughput scales with batch size
+# (compared with fitting each site with scipy, when it is installed).
+
+import os
+import sys
+
+import numpy as np
+
+# Make the shared modules in experiments/ importable when running this script directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Benchmark import best_time, uniform_columns
+from WindEnergy import annual_energy, fit_weibull
+
+# Function to generate a year of hourly Weibull-distributed wind speeds for n sites with known k and c
+def random_sites(n, hours=8760, seed=0):
+    rng = np.random.default_rng(seed)
+    k, c = uniform_columns(rng, n, [(1.5, 3.0), (4.0, 10.0)])
+    speeds = c[:, None] * rng.weibull(k[:, None], (n, hours))
+    return speeds, k, c
+
+if __name__ == "__main__":
+    # Accuracy check against the true parameters and against one-site-at-a-time fits
+    speeds, true_k, true_c = random_sites(1000)
+    k, c = fit_weibull(speeds)
+    single = np.array([fit_weibull(series) for series in speeds])[:, :, 0]
+    assert np.allclose(single[:, 0], k, rtol=1e-9) and np.allclose(single[:, 1], c, rtol=1e-9), "Batch fit differs from single-site fits"
+    print(f"Median relative error over 1000 sites: k {np.median(np.abs(k / true_k - 1)):.2%}, c {np.median(np.abs(c / true_c - 1)):.2%}\n")
+
+    # scipy's generic per-site optimizer is the usual alternative; it is only used here if installed
+    try:
+        from scipy.stats import weibull_min
+        scipy_k, _, scipy_c = weibull_min.fit(speeds[0], floc=0)
+        print(f"scipy.stats.weibull_min.fit on the first site: k {scipy_k:.4f} / {k[0]:.4f}, c {scipy_c:.4f} / {c[0]:.4f}\n")
+    except ImportError:
+        weibull_min = None
+
+    print(f"{'sites':>10} {'scipy (sites/s)':>16} {'batch fit (sites/s)':>20} {'speed-up':>10} {'AEP (sites/s)':>15}")
+    for n in [10, 100, 1000, 5000]:
+        speeds, _, _ = random_sites(n)
+        scipy_time = best_time(lambda: [weibull_min.fit(series, floc=0) for series in speeds[:10]], 1) * n / 10 if weibull_min else None
+        batch_time = best_time(lambda: fit_weibull(speeds))
+        k, c = fit_weibull(speeds)
+        aep_time = best_time(lambda: annual_energy(k, c, "generic-2MW", np.full(n, 1.2)))
+        scipy_rate = f"{n / scipy_time:,.0f}" if scipy_time else "-"
+        speed_up = f"{scipy_time / batch_time:,.1f}x" if scipy_time else "-"
+        print(f"{n:>10} {scipy_rate:>16} {n / batch_time:>20,.0f} {speed_up:>10} {n / aep_time:>15,.0f}")
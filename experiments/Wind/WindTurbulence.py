@@ -1,20 +1,23 @@
-import requests
+import datetime
+import math
+import os
 import statistics
+import sys
 from collections import defaultdict
 
+import numpy as np
+
+# Make the shared modules in experiments/ importable when running this script directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from NasaPower import get_power_data
+
 def get_hourly_wind_data(lat, lon, start_date, end_date):
     """
     Retrieves hourly wind speed data (WS10M) from NASA POWER API.
     start_date and end_date should be in 'YYYYMMDD' format.
     """
-    url = (
-        f"https://power.larc.nasa.gov/api/temporal/hourly/point?"
-        f"parameters=WS10M&community=SB&longitude={lon}&latitude={lat}"
-        f"&start={start_date}&end={end_date}&format=JSON"
-    )
-    response = requests.get(url)
-    response.raise_for_status()
-    data = response.json()
+    data = get_power_data(lat, lon, start_date, end_date, ["WS10M"], temporal="hourly", community="SB")
     # The wind speed data is under data['properties']['parameter']['WS10M']
     return data['properties']['parameter']['WS10M']
 
@@ -42,21 +45,87 @@ def calculate_daily_turbulence(wind_data):
             daily_ti[day] = 0  # Not enough data points
     return daily_ti
 
-# Example usage:
-latitude = 37.98
-longitude = 23.73
-# Define a period (e.g., one week)
-start_date = "20230101"
-end_date   = "20231207"
-
-try:
-    wind_data = get_hourly_wind_data(latitude, longitude, start_date, end_date)
-    daily_turbulence = calculate_daily_turbulence(wind_data)
-
-    for day, ti in sorted(daily_turbulence.items()):
-        print(f"Date: {day}, Turbulence Intensity: {ti:.2f}%")
-        
-    total_mean = statistics.mean(daily_turbulence.values())
-    print(f"Mean Turbulence Intensity: {total_mean:.2f}%")
-except Exception as e:
-    print("An error occurred:", e)
+# Function to split a 'YYYYMMDD' date range into calendar-month chunks
+def month_chunks(start_date, end_date):
+    start = datetime.datetime.strptime(start_date, "%Y%m%d").date()
+    end = datetime.datetime.strptime(end_date, "%Y%m%d").date()
+    while start <= end:
+        next_month = (start.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+        chunk_end = min(end, next_month - datetime.timedelta(days=1))
+        yield start.strftime("%Y%m%d"), chunk_end.strftime("%Y%m%d")
+        start = next_month
+
+def iter_hourly_wind_data(lat, lon, start_date, end_date):
+    """
+    Streams hourly WS10M values as (timestamp 'YYYYMMDDHH', wind speed) pairs.
+    The range is requested one month at a time, so only one month of the series
+    is in memory at any point (and each month is cached separately by NasaPower).
+    """
+    for chunk_start, chunk_end in month_chunks(start_date, end_date):
+        yield from get_hourly_wind_data(lat, lon, chunk_start, chunk_end).items()
+
+def calculate_daily_turbulence_streaming(wind_stream):
+    """
+    Calculates daily turbulence intensity (TI) in a single pass over (timestamp, wind speed) pairs,
+    e.g. from iter_hourly_wind_data, keeping only a running Welford accumulator
+    (count, mean, sum of squared deviations) per day. Gives the same values as calculate_daily_turbulence.
+    """
+    accumulators = {}
+    for timestamp, wind_speed in wind_stream:
+        day = timestamp[:8]  # Extract YYYYMMDD
+        count, mean, m2 = accumulators.get(day, (0, 0.0, 0.0))
+        count += 1
+        delta = wind_speed - mean
+        mean += delta / count
+        m2 += delta * (wind_speed - mean)
+        accumulators[day] = (count, mean, m2)
+
+    daily_ti = {}
+    for day, (count, mean, m2) in accumulators.items():
+        if count > 1:
+            stdev_speed = math.sqrt(m2 / (count - 1))
+            daily_ti[day] = (stdev_speed / mean * 100) if mean != 0 else 0
+        else:
+            daily_ti[day] = 0  # Not enough data points
+    return daily_ti
+
+def calculate_daily_turbulence_array(wind_data):
+    """
+    NumPy kernel for a series that is already loaded: places the hourly values in a
+    (days x 24) array and computes every day's mean, sample standard deviation and TI at once.
+    Hours missing from the series are ignored. Gives the same values as calculate_daily_turbulence.
+    """
+    timestamps = np.array(list(wind_data.keys())).astype(np.int64)  # YYYYMMDDHH
+    speeds = np.fromiter(wind_data.values(), dtype=float, count=len(timestamps))
+    days, day_index = np.unique(timestamps // 100, return_inverse=True)
+    hours = timestamps % 100
+
+    grid = np.full((len(days), 24), np.nan)
+    grid[day_index, hours] = speeds
+    count = np.sum(~np.isnan(grid), axis=1)
+    mean = np.nansum(grid, axis=1) / count
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stdev = np.sqrt(np.nansum((grid - mean[:, None]) ** 2, axis=1) / (count - 1))
+        ti = np.where((count > 1) & (mean != 0), stdev / mean * 100, 0)
+    return dict(zip(days.astype(str).tolist(), ti.tolist()))
+
+if __name__ == "__main__":
+    # Example usage:
+    latitude = 37.98
+    longitude = 23.73
+    # Define a period (e.g., one week)
+    start_date = "20230101"
+    end_date   = "20231207"
+
+    try:
+        # Stream the year month by month instead of holding the whole hourly series
+        wind_stream = iter_hourly_wind_data(latitude, longitude, start_date, end_date)
+        daily_turbulence = calculate_daily_turbulence_streaming(wind_stream)
+
+        for day, ti in sorted(daily_turbulence.items()):
+            print(f"Date: {day}, Turbulence Intensity: {ti:.2f}%")
+
+        total_mean = statistics.mean(daily_turbulence.values())
+        print(f"Mean Turbulence Intensity: {total_mean:.2f}%")
+    except Exception as e:
+        print("An error occurred:", e)
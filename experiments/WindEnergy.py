@@ -0,0 +1,171 @@
+# Description: Annual energy production (AEP) estimator for wind sites. Fits Weibull shape (k) and scale (c)
+# parameters to hourly hub-height wind speeds by maximum likelihood (vectorized over many sites), integrates the
+# fitted distributions against turbine power curves (see Wind/power_curves.json) and applies the air-density
+# correction, so candidate sites can be ranked by MWh/year instead of by mean wind speed.
+
+import json
+import os
+
+import numpy as np
+
+from NasaPower import get_power_data_batch
+from PowerSeries import nan_mean, responses_to_array
+from WindResource import WIND_PARAMETERS, air_density, extrapolate_speed, shear_exponent
+
+POWER_CURVES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Wind", "power_curves.json")
+
+STANDARD_AIR_DENSITY = 1.225  # kg/m³, the density power curves are specified at
+
+HOURS_PER_YEAR = 8760
+
+# Sites are fitted in blocks of this many, so a large batch of hourly series never needs
+# more than a few block-sized temporary arrays
+BLOCK_SITES = 256
+
+# Function to load every turbine power curve from a JSON file, keyed by turbine name
+def load_power_curves(path=POWER_CURVES_PATH):
+    with open(path) as file:
+        return json.load(file)
+
+# Function to get a power curve by name; a dict with speeds and power_kw is used as is (custom turbines)
+def get_power_curve(turbine, curves=None):
+    if isinstance(turbine, dict):
+        return turbine
+    curves = curves or load_power_curves()
+    if turbine not in curves:
+        raise KeyError(f"No power curve for turbine {turbine}")
+    return curves[turbine]
+
+# Function to get the output (kW) of a turbine at an array of wind speeds
+def curve_power(curve, speeds):
+    # Linear interpolation between the tabulated points; no output above the cut-out speed
+    speeds = np.asarray(speeds, dtype=float)
+    power = np.interp(speeds, curve["speeds"], curve["power_kw"], left=0, right=0)
+    return np.where(speeds > curve.get("cut_out", curve["speeds"][-1]), 0, power)
+
+def _fit_weibull_block(speeds, iterations, tolerance):
+    valid = np.isfinite(speeds) & (speeds > 0)
+    count = valid.sum(axis=1)
+    x = np.where(valid, speeds, 0)
+    # Normalise by the mean speed so x**k stays well conditioned; k does not depend on the scale
+    mean = np.sum(x, axis=1) / np.maximum(count, 1)
+    scale = np.where(mean > 0, mean, 1)
+    x = x / scale[:, None]
+    log_x = np.where(valid, np.log(np.where(valid, x, 1)), 0)
+    mean_log = np.sum(log_x, axis=1) / np.maximum(count, 1)
+
+    # Start from the moment estimate k ≈ (std / mean) ** -1.086
+    std = np.sqrt(np.sum(np.where(valid, (x - 1) ** 2, 0), axis=1) / np.maximum(count - 1, 1))
+    k = np.clip(np.where(std > 0, std, 1) ** -1.086, 0.1, 20)
+
+    # Newton iterations on the MLE condition sum(x^k ln x) / sum(x^k) - 1/k - mean(ln x) = 0
+    # (sites without samples give NaN steps and are masked out at the end)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for _ in range(iterations):
+            x_k = np.where(valid, np.exp(k[:, None] * log_x), 0)
+            a = np.sum(x_k, axis=1)
+            b = np.sum(x_k * log_x, axis=1)
+            c = np.sum(x_k * log_x ** 2, axis=1)
+            f = b / a - 1 / k - mean_log
+            derivative = (c * a - b ** 2) / a ** 2 + 1 / k ** 2
+            step = f / derivative
+            k = np.where(k - step > 0, k - step, k / 2)
+            if not np.any(np.abs(step) > tolerance * k):
+                break
+
+    x_k = np.where(valid, np.exp(k[:, None] * log_x), 0)
+    c = scale * (np.sum(x_k, axis=1) / np.maximum(count, 1)) ** (1 / k)
+    enough = count >= 2
+    return np.where(enough, k, np.nan), np.where(enough, c, np.nan)
+
+# Function to fit Weibull parameters to the wind speed series of many sites by maximum likelihood
+def fit_weibull(speeds, iterations=50, tolerance=1e-10):
+    """
+    speeds has shape (sites, samples), e.g. hourly hub-height speeds, with NaN for missing hours;
+    a single series (1D array, list or get_hourly_wind_data dict) is treated as one site.
+    Calm (zero) speeds are left out of the fit. Returns arrays (k, c) with NaN for sites with
+    fewer than two valid samples.
+    """
+    if isinstance(speeds, dict):
+        speeds = list(speeds.values())
+    speeds = np.atleast_2d(np.asarray(speeds, dtype=float))
+    k = np.empty(len(speeds))
+    c = np.empty(len(speeds))
+    for start in range(0, len(speeds), BLOCK_SITES):
+        block = slice(start, start + BLOCK_SITES)
+        k[block], c[block] = _fit_weibull_block(speeds[block], iterations, tolerance)
+    return k, c
+
+# Function to compute the probability of each wind speed bin under Weibull distributions, shape (sites, bins)
+def weibull_bin_probabilities(k, c, edges):
+    k = np.asarray(k, dtype=float)[:, None]
+    c = np.asarray(c, dtype=float)[:, None]
+    cdf = 1 - np.exp(-(np.asarray(edges)[None, :] / c) ** k)
+    return np.diff(cdf, axis=1)
+
+# Function to estimate the annual energy production of a turbine at many sites from their Weibull parameters
+def annual_energy(k, c, turbine="generic-2MW", density=None, losses=0.0, bin_width=0.25, max_speed=40):
+    """
+    Integrates the power curve over the Weibull distribution of each site in bins of bin_width m/s.
+    density (kg/m³ per site) corrects the wind speeds to the standard density of the power curve,
+    v * (density / 1.225) ** (1/3), which for a Weibull distribution scales c by the same factor.
+    Returns (aep_mwh, capacity_factor) arrays.
+    """
+    curve = get_power_curve(turbine)
+    c = np.asarray(c, dtype=float)
+    if density is not None:
+        c = c * (np.asarray(density, dtype=float) / STANDARD_AIR_DENSITY) ** (1 / 3)
+
+    edges = np.arange(0, max_speed + bin_width, bin_width)
+    power = curve_power(curve, (edges[:-1] + edges[1:]) / 2)
+    mean_power_kw = weibull_bin_probabilities(k, c, edges) @ power * (1 - losses)
+    return mean_power_kw * HOURS_PER_YEAR / 1000, mean_power_kw / curve["rated_kw"]
+
+# Function to estimate the annual energy production of a turbine at many sites from hourly POWER data
+def get_wind_energy(sites, start_date, end_date, turbine="generic-2MW", hub_height=None, losses=0.0,
+                    use_cache=True, **engine_options):
+    """
+    Fetches hourly WS10M, WS50M, PS and T2M for the sites (one request per POWER grid cell),
+    extrapolates WS50M to the hub height with each site's mean shear exponent, fits Weibull
+    parameters to the hub-height series and integrates them against the power curve with the
+    site's mean air density. start_date and end_date are 'YYYYMMDD'; the hub height defaults
+    to the turbine's. Returns a dict of arrays, one value per site.
+    """
+    curve = get_power_curve(turbine)
+    hub_height = hub_height or curve["hub_height"]
+    responses = get_power_data_batch(
+        sites, start_date, end_date, WIND_PARAMETERS, temporal="hourly", community="SB", use_cache=use_cache, **engine_options
+    )
+    _, values = responses_to_array(responses, WIND_PARAMETERS, temporal="hourly")
+    ws10m, ws50m, pressure, temperature = np.moveaxis(values, 2, 0)
+
+    shear = shear_exponent(nan_mean(ws10m), nan_mean(ws50m))
+    hub_speed = extrapolate_speed(ws50m, shear[:, None], 50, hub_height)
+    density = nan_mean(air_density(pressure, temperature))
+    k, c = fit_weibull(hub_speed)
+    aep_mwh, capacity_factor = annual_energy(k, c, curve, density, losses)
+
+    return {
+        "hub_height": hub_height,
+        "mean_speed": nan_mean(hub_speed),
+        "shear": shear,
+        "density": density,
+        "k": k,
+        "c": c,
+        "aep_mwh": aep_mwh,
+        "capacity_factor": capacity_factor,
+    }
+
+
+if __name__ == "__main__":
+    # Example usage: rank a grid of candidate sites around Athens by annual energy of a 2 MW turbine
+    sites = [(37.5 + 0.25 * i, 23.0 + 0.25 * j) for i in range(4) for j in range(4)]
+    energy = get_wind_energy(sites, "20230101", "20231231", turbine="generic-2MW", losses=0.1)
+
+    for index in np.argsort(-energy["aep_mwh"]):
+        lat, lon = sites[index]
+        print(
+            f"({lat:.2f}, {lon:.2f}): {energy['aep_mwh'][index]:,.0f} MWh/year, "
+            f"capacity factor {energy['capacity_factor'][index]:.1%}, "
+            f"k={energy['k'][index]:.2f}, c={energy['c'][index]:.2f} m/s, {energy['density'][index]:.3f} kg/m³"
+        )
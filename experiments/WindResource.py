@@ -0,0 +1,86 @@
+# Description: Vectorized wind resource engine. Fetches WS10M, WS50M, PS and T2M together for many sites
+# (one POWER request per grid cell) and computes, as array operations across sites and months, the monthly
+# mean wind speeds, the wind shear exponent, hub-height wind speed, air density and wind power density.
+
+import numpy as np
+
+from NasaPower import get_power_data_batch
+from PowerSeries import PowerSeries, group_reduce, nan_mean
+
+WIND_PARAMETERS = ["WS10M", "WS50M", "PS", "T2M"]
+
+R_DRY_AIR = 287.05  # Gas constant for dry air (J/(kg·K))
+
+# Function to average a (sites, months) array by calendar month, giving (sites, 12)
+def monthly_means(values, series):
+    return group_reduce(values[:, :, None], series.months - 1, 12)[:, :, 0]
+
+# Function to compute the wind shear exponent (power law) from speeds at two heights
+def shear_exponent(v_low, v_high, low_height=10, high_height=50):
+    # alpha = ln(v_high / v_low) / ln(high_height / low_height); NaN where a speed is not positive
+    v_low = np.asarray(v_low, dtype=float)
+    v_high = np.asarray(v_high, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        alpha = np.log(v_high / v_low) / np.log(high_height / low_height)
+    return np.where((v_low > 0) & (v_high > 0), alpha, np.nan)
+
+# Function to extrapolate wind speed from a reference height to the hub height with the power law
+def extrapolate_speed(v_ref, alpha, ref_height=50, hub_height=100):
+    return np.asarray(v_ref, dtype=float) * (hub_height / ref_height) ** np.asarray(alpha, dtype=float)
+
+# Function to compute air density (kg/m³) from surface pressure (kPa) and temperature (°C)
+def air_density(pressure_kpa, temperature_c):
+    return np.asarray(pressure_kpa, dtype=float) * 1000 / (R_DRY_AIR * (np.asarray(temperature_c, dtype=float) + 273.15))
+
+# Function to compute wind power density (W/m²) from air density and wind speed
+def power_density(density, speed):
+    return 0.5 * np.asarray(density, dtype=float) * np.asarray(speed, dtype=float) ** 3
+
+# Function to compute the wind resource of many sites from monthly POWER responses
+def compute_wind_resource(responses, hub_height=100):
+    """
+    responses is a list of monthly POWER responses with WS10M, WS50M, PS and T2M (None for failed sites).
+    Returns a dict of arrays: keys ('YYYYMM'), ws10m, ws50m, shear, hub_speed, density and
+    power_density with shape (sites, months), the same quantities averaged by calendar month
+    (monthly_<name>, shape (sites, 12)) and their means over the whole period (mean_<name>, shape (sites,)).
+    Power density is computed from monthly mean speeds, so it is a lower bound of the true mean (v³ is convex).
+    """
+    series = PowerSeries.from_responses(responses, WIND_PARAMETERS)
+    ws10m, ws50m, pressure, temperature = np.moveaxis(series.values, 2, 0)
+
+    shear = shear_exponent(ws10m, ws50m)
+    hub_speed = extrapolate_speed(ws50m, shear, 50, hub_height)
+    density = air_density(pressure, temperature)
+
+    resource = {
+        "keys": series.keys,
+        "hub_height": hub_height,
+        "ws10m": ws10m,
+        "ws50m": ws50m,
+        "shear": shear,
+        "hub_speed": hub_speed,
+        "density": density,
+        "power_density": power_density(density, hub_speed),
+    }
+    for name in ["ws10m", "ws50m", "shear", "hub_speed", "density", "power_density"]:
+        resource[f"monthly_{name}"] = monthly_means(resource[name], series)
+        resource[f"mean_{name}"] = nan_mean(resource[name], axis=1)
+    return resource
+
+# Function to fetch and compute the wind resource of many sites in one call
+def get_wind_resource(sites, start_year, end_year, hub_height=100, use_cache=True, **engine_options):
+    # sites is a list of (lat, lon); sites in the same POWER grid cell share one request
+    responses = get_power_data_batch(sites, start_year, end_year, WIND_PARAMETERS, community="SB", use_cache=use_cache, **engine_options)
+    return compute_wind_resource(responses, hub_height)
+
+
+if __name__ == "__main__":
+    # Example usage: wind resource at 100 m for a grid of sites around Athens
+    sites = [(37.5 + 0.1 * i, 23.2 + 0.1 * j) for i in range(10) for j in range(10)]
+    resource = get_wind_resource(sites, 2017, 2023, hub_height=100)
+
+    for (lat, lon), speed, alpha, rho, wpd in list(zip(
+        sites, resource["mean_hub_speed"], resource["mean_shear"], resource["mean_density"], resource["mean_power_density"]
+    ))[:5]:
+        print(f"({lat:.2f}, {lon:.2f}): {speed:.2f} m/s at 100 m, shear {alpha:.3f}, {rho:.3f} kg/m³, {wpd:.1f} W/m²")
+    print("Monthly power density of the first site (W/m²):", np.round(resource["monthly_power_density"][0], 1))
@@ -0,0 +1,182 @@
+# Description: Offline land-cover backend reading downloaded ESA WorldCover GeoTIFF tiles (3x3 degree,
+# 10 m). Windows are read with memory-mapped or windowed access through DemRaster, class areas of
+# rectangles, buffers and polygons are summed with np.bincount weighted by the latitude-corrected pixel area,
+# and the results match the Earth Engine path (LandCover / LandTypePercentages) without any API calls.
+
+import math
+import os
+
+import numpy as np
+
+from DemRaster import METERS_PER_DEGREE_LAT, DemRaster
+from LandCover import class_names, land_cover_classes, percentage_by_class
+
+WORLDCOVER_DIR = os.environ.get("WORLDCOVER_DIR", "worldcover")
+
+RES = 1 / 12000  # WorldCover pixel size in degrees (about 10 m)
+TILE_DEGREES = 3
+
+# Sites are read in blocks of this many pixels, one window per block
+BLOCK_SIZE = 2048
+
+EARTH_RADIUS = 6371008.8  # Mean Earth radius (m)
+
+# Function to get the file name of the WorldCover tile containing a point
+def tile_name(lat, lon):
+    south = int(math.floor(lat / TILE_DEGREES) * TILE_DEGREES)
+    west = int(math.floor(lon / TILE_DEGREES) * TILE_DEGREES)
+    return f"ESA_WorldCover_10m_2020_v100_{'N' if south >= 0 else 'S'}{abs(south):02d}{'E' if west >= 0 else 'W'}{abs(west):03d}_Map.tif"
+
+# Function to get the area (m²) of the pixels of global rows [row_start, row_end)
+def row_areas(row_start, row_end):
+    top = np.radians(90 - np.arange(row_start, row_end) * RES)
+    bottom = np.radians(90 - np.arange(row_start + 1, row_end + 1) * RES)
+    return EARTH_RADIUS ** 2 * math.radians(RES) * (np.sin(top) - np.sin(bottom))
+
+class WorldCover:
+    """
+    WorldCover classes on the global 1/12000 degree grid (row 0 at 90N, column 0 at 180W), read from the
+    tiles in directory (opened on first use) or from given DemRasters aligned to that grid. Class 0 is no data.
+    """
+
+    def __init__(self, directory=WORLDCOVER_DIR, rasters=None):
+        self.directory = directory
+        self.rasters = rasters
+        self._tiles = {}
+
+    def _tile(self, south, west):
+        # None where the tile has not been downloaded
+        if (south, west) not in self._tiles:
+            path = os.path.join(self.directory, tile_name(south, west))
+            self._tiles[(south, west)] = DemRaster.open(path) if os.path.exists(path) else None
+        return self._tiles[(south, west)]
+
+    def _rasters_for(self, row_start, row_end, col_start, col_end):
+        if self.rasters is not None:
+            return self.rasters
+        lat_max, lat_min = 90 - row_start * RES, 90 - row_end * RES
+        lon_min, lon_max = col_start * RES - 180, col_end * RES - 180
+        souths = range(int(math.floor(lat_min / TILE_DEGREES)), int(math.ceil(lat_max / TILE_DEGREES)))
+        wests = range(int(math.floor(lon_min / TILE_DEGREES)), int(math.ceil(lon_max / TILE_DEGREES)))
+        tiles = [self._tile(south * TILE_DEGREES, west * TILE_DEGREES) for south in souths for west in wests]
+        return [tile for tile in tiles if tile is not None]
+
+    def read_window(self, row_start, row_end, col_start, col_end):
+        # Class codes of global rows [row_start, row_end) and columns [col_start, col_end), 0 where there are no tiles
+        window = np.zeros((row_end - row_start, col_end - col_start), dtype=np.uint8)
+        for raster in self._rasters_for(row_start, row_end, col_start, col_end):
+            row_offset = int(round((90 - raster.north) / RES))
+            col_offset = int(round((raster.west + 180) / RES))
+            r0, r1 = max(row_start, row_offset), min(row_end, row_offset + raster.height)
+            c0, c1 = max(col_start, col_offset), min(col_end, col_offset + raster.width)
+            if r0 < r1 and c0 < c1:
+                window[r0 - row_start:r1 - row_start, c0 - col_start:c1 - col_start] = np.asarray(
+                    raster.data[r0 - row_offset:r1 - row_offset, c0 - col_offset:c1 - col_offset]
+                )
+        return window
+
+    def _windows(self, row_starts, row_ends, col_starts, col_ends):
+        # Yields (site, window) for every site, reading one window per block of nearby sites
+        blocks = (row_starts // BLOCK_SIZE) * (360 * 12000 // BLOCK_SIZE + 1) + col_starts // BLOCK_SIZE
+        for block in np.unique(blocks):
+            sites = np.flatnonzero(blocks == block)
+            top, left = row_starts[sites].min(), col_starts[sites].min()
+            window = self.read_window(top, row_ends[sites].max(), left, col_ends[sites].max())
+            for site in sites:
+                yield site, window[row_starts[site] - top:row_ends[site] - top, col_starts[site] - left:col_ends[site] - left]
+
+    def sample_land_cover(self, sites):
+        # Same result as LandCover.sample_land_cover: dict of arrays code (0 where there is no data) and type
+        sites = np.asarray(sites, dtype=float).reshape(-1, 2)
+        rows = np.floor((90 - sites[:, 0]) / RES).astype(np.int64)
+        cols = np.floor((sites[:, 1] + 180) / RES).astype(np.int64)
+        codes = np.zeros(len(sites), dtype=np.int64)
+        for site, window in self._windows(rows, rows + 1, cols, cols + 1):
+            codes[site] = window[0, 0]
+        return {"code": codes, "type": class_names(codes)}
+
+    def area_by_class(self, sites, half_size=0.0011, radius=None):
+        """
+        Area (m²) of every class around each site, as a list of {class code: area} dicts like
+        LandTypePercentages. The region is the rectangle of ±half_size degrees around the site or, when
+        radius is given, a circular buffer of radius metres. Pixels count when their centre is inside.
+        """
+        sites = np.asarray(sites, dtype=float).reshape(-1, 2)
+        lats, lons = sites[:, 0], sites[:, 1]
+        if radius is None:
+            half_lat = np.full(len(sites), float(half_size))
+            half_lon = half_lat
+        else:
+            half_lat = np.full(len(sites), radius / METERS_PER_DEGREE_LAT)
+            half_lon = half_lat / np.cos(np.radians(lats))
+        row_starts = np.floor((90 - lats - half_lat) / RES).astype(np.int64)
+        row_ends = np.floor((90 - lats + half_lat) / RES).astype(np.int64) + 1
+        col_starts = np.floor((lons - half_lon + 180) / RES).astype(np.int64)
+        col_ends = np.floor((lons + half_lon + 180) / RES).astype(np.int64) + 1
+
+        results = [None] * len(sites)
+        for site, window in self._windows(row_starts, row_ends, col_starts, col_ends):
+            # Offsets of the pixel centres from the site, in degrees
+            dlat = 90 - (np.arange(row_starts[site], row_ends[site]) + 0.5) * RES - lats[site]
+            dlon = (np.arange(col_starts[site], col_ends[site]) + 0.5) * RES - 180 - lons[site]
+            if radius is None:
+                inside = (np.abs(dlat) <= half_lat[site])[:, None] & (np.abs(dlon) <= half_lon[site])[None, :]
+            else:
+                dy = dlat * METERS_PER_DEGREE_LAT
+                dx = dlon * METERS_PER_DEGREE_LAT * math.cos(math.radians(lats[site]))
+                inside = dy[:, None] ** 2 + dx[None, :] ** 2 <= radius ** 2
+            results[site] = self._class_areas(window, inside, row_starts[site])
+        return results
+
+    def polygon_area_by_class(self, polygon):
+        # Area (m²) of every class inside a polygon given as a list of (lat, lon) vertices
+        vertices = np.asarray(polygon, dtype=float)
+        row_start = int(np.floor((90 - vertices[:, 0].max()) / RES))
+        row_end = int(np.floor((90 - vertices[:, 0].min()) / RES)) + 1
+        col_start = int(np.floor((vertices[:, 1].min() + 180) / RES))
+        col_end = int(np.floor((vertices[:, 1].max() + 180) / RES)) + 1
+        window = self.read_window(row_start, row_end, col_start, col_end)
+
+        # Even-odd rule on the pixel centres, one edge at a time
+        lat = (90 - (np.arange(row_start, row_end) + 0.5) * RES)[:, None]
+        lon = ((np.arange(col_start, col_end) + 0.5) * RES - 180)[None, :]
+        inside = np.zeros(window.shape, dtype=bool)
+        for (lat1, lon1), (lat2, lon2) in zip(vertices, np.roll(vertices, -1, axis=0)):
+            if lat1 == lat2:
+                continue
+            crosses = (lat1 > lat) != (lat2 > lat)
+            inside ^= crosses & (lon < lon1 + (lat - lat1) * (lon2 - lon1) / (lat2 - lat1))
+        return self._class_areas(window, inside, row_start)
+
+    @staticmethod
+    def _class_areas(window, inside, row_start):
+        areas = np.broadcast_to(row_areas(row_start, row_start + window.shape[0])[:, None], window.shape)
+        totals = np.bincount(window[inside], weights=areas[inside], minlength=256)
+        return {int(code): float(totals[code]) for code in np.flatnonzero(totals) if code != 0}
+
+# Function to build a synthetic WorldCover raster (blocks of random classes) for trying the backend offline
+def synthetic_worldcover(west=21.0, north=38.0, size=6000, block=100, seed=0):
+    rng = np.random.default_rng(seed)
+    codes = rng.choice(list(land_cover_classes), size=(size // block, size // block))
+    data = np.kron(codes, np.ones((block, block), dtype=np.uint8)).astype(np.uint8)
+    return DemRaster.from_array(data, west, north, RES, RES)
+
+
+if __name__ == "__main__":
+    import time
+
+    # Example usage: class areas for thousands of buffers on a synthetic tile (use WorldCover() for downloaded tiles)
+    worldcover = WorldCover(rasters=[synthetic_worldcover()])
+    lat, lon = 37.8, 21.2
+    area_by_class = worldcover.area_by_class([(lat, lon)])[0]
+    total_area = sum(area_by_class.values())
+    print(f"Total Area of the Selected Region: {total_area:.2f} m² ({total_area / 1e6:.2f} km²)")
+    for land_cover, percentage in percentage_by_class(area_by_class).items():
+        print(f"{land_cover}: {percentage:.2f}%")
+
+    rng = np.random.default_rng(0)
+    sites = list(zip(rng.uniform(37.55, 37.95, 5000), rng.uniform(21.05, 21.45, 5000)))
+    start = time.perf_counter()
+    areas = worldcover.area_by_class(sites, radius=200)
+    print(f"Class areas of {len(sites):,} 200 m buffers in {time.perf_counter() - start:.2f} s")
+    print("Classes at the first sites:", worldcover.sample_land_cover(sites[:3])["type"].tolist())